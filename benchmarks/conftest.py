@@ -0,0 +1,77 @@
+import pytest
+
+from .measure import load_baseline, regressions, save_baseline
+from .seed import seed
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--bench-users', type=int, default=50)
+    group.addoption('--bench-groups', type=int, default=30)
+    group.addoption('--bench-posts', type=int, default=5000)
+    group.addoption('--bench-rounds', type=int, default=30)
+    group.addoption(
+        '--bench-seconds', type=float, default=3.0,
+        help='длительность нагрузки в замере конкурентного доступа')
+    group.addoption(
+        '--bench-threshold', type=float, default=None,
+        help='допустимое замедление p50/p95, 1.0 — вдвое медленнее baseline')
+    group.addoption(
+        '--bench-update-baseline', action='store_true',
+        help='записать замеры в baseline.json вместо сравнения')
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'benchmark(threshold=1.0): замер view со сравнением с baseline.json'
+    )
+    config.bench_results = {}
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if config.getoption('--bench-update-baseline') and config.bench_results:
+        baseline = load_baseline()
+        baseline.update(config.bench_results)
+        save_baseline(baseline)
+
+
+@pytest.fixture(scope='session')
+def bench_data(django_db_setup, django_db_blocker, request):
+    option = request.config.getoption
+    with django_db_blocker.unblock():
+        return seed(
+            users=option('--bench-users'),
+            groups=option('--bench-groups'),
+            posts=option('--bench-posts'),
+        )
+
+
+@pytest.fixture
+def bench_client(bench_data, client):
+    client.force_login(bench_data['reader'])
+    return client
+
+
+@pytest.fixture
+def check_benchmark(request):
+    """Сравнивает замер с baseline по порогу из маркера benchmark."""
+    config = request.config
+    marker = request.node.get_closest_marker('benchmark')
+    threshold = config.getoption('--bench-threshold')
+    if threshold is None:
+        threshold = marker.kwargs.get('threshold', 1.0) if marker else 1.0
+    baseline = load_baseline()
+
+    def check(name, result, budget=None):
+        config.bench_results[name] = result
+        if config.getoption('--bench-update-baseline'):
+            return
+        if name not in baseline:
+            pytest.fail(f'нет baseline для {name}, '
+                        'запустите с --bench-update-baseline')
+        problems = regressions(
+            result, baseline[name], threshold, budget)
+        assert not problems, f'{name}: ' + '; '.join(problems)
+    return check
@@ -0,0 +1,119 @@
+import gc
+import json
+import os
+import statistics
+import time
+
+from django.db import connection
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+TIME_SLACK_MS = 2
+
+
+class SqlTimer:
+    """execute_wrapper, который считает запросы и их суммарное время."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def read(response, chunks=None):
+    """Дочитывает потоковый ответ: его запросы идут уже после view.
+
+    chunks ограничивает число частей для бесконечных потоков (SSE).
+    """
+    if not response.streaming:
+        return
+    content = iter(response.streaming_content)
+    try:
+        for number, _ in enumerate(content, 1):
+            if chunks is not None and number >= chunks:
+                break
+    finally:
+        response.close()
+
+
+def measure(request, rounds, warmup=2, prepare=None, status=200):
+    """Прогоняет request() и собирает задержку, число и время SQL.
+
+    prepare() вызывается перед каждым прогоном вне замера: например,
+    чтобы заново залогинить клиента после logout или сбросить
+    страничный кеш. Ответ с другим кодом, чем status, роняет замер:
+    иначе замерялась бы страница ошибки.
+    """
+    latencies, queries, sql_times = [], [], []
+    # Сборщик мусора даёт редкие паузы, которые делают p95 случайным
+    gc.collect()
+    gc.disable()
+    try:
+        for number in range(warmup + rounds):
+            if prepare is not None:
+                prepare()
+            timer = SqlTimer()
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                response = request()
+                elapsed = time.perf_counter() - started
+            assert response.status_code == status, response.status_code
+            if number < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(timer.queries)
+            sql_times.append(timer.seconds * 1000)
+    finally:
+        gc.enable()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'queries': max(queries),
+        'sql_ms': round(statistics.median(sql_times), 3),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def regressions(result, baseline, threshold, budget=None):
+    """Описание регрессий замера относительно baseline или пустой список.
+
+    Число запросов сравнивается с @query_budget view, а если его нет —
+    точно с baseline. Время — с допуском threshold (1.0 — вдвое
+    медленнее baseline) плюс TIME_SLACK_MS, чтобы шум на долях
+    миллисекунды не ронял замер.
+    """
+    problems = []
+    limit = baseline['queries'] if budget is None else budget
+    if result['queries'] > limit:
+        problems.append(f"SQL-запросов {result['queries']} > {limit}")
+    for metric in ('p50_ms', 'p95_ms', 'sql_ms'):
+        limit = baseline[metric] * (1 + threshold) + TIME_SLACK_MS
+        if result[metric] > limit:
+            problems.append(
+                f'{metric} {result[metric]} > {limit:.3f} '
+                f'(baseline {baseline[metric]})')
+    return problems
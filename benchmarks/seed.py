@@ -0,0 +1,46 @@
+import random
+
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts.models import Follow, Group, Post, User
+
+BENCH_PASSWORD = 'bench-password'
+
+
+def seed(users, groups, posts, seed_value=2022):
+    """Наполняет базу для замеров: пользователи, группы, посты, подписки.
+
+    Первый пользователь — читатель, от его имени идут запросы; он же
+    автор первого поста, чтобы страница редактирования была доступна.
+    """
+    fake = Faker('ru_RU')
+    Faker.seed(seed_value)
+    rnd = random.Random(seed_value)
+    authors = [
+        User.objects.create_user(
+            f'bench_{num}', password=BENCH_PASSWORD,
+            first_name=fake.first_name(), last_name=fake.last_name())
+        for num in range(users)
+    ]
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}'), posts_count=0)
+    Post.objects.bulk_create(
+        Post(
+            text=fake.paragraph(nb_sentences=5),
+            author=authors[0] if num == 0 else rnd.choice(authors),
+            group=rnd.choice(group_list + [None]),
+        )
+        for num in range(posts)
+    )
+    reader = authors[0]
+    Follow.objects.bulk_create(
+        [Follow(user=reader, author=author) for author in authors[1:6]]
+        + [Follow(user=reader, group=group) for group in group_list[:2]]
+    )
+    return {
+        'reader': reader,
+        'author': authors[1],
+        'group': group_list[0],
+        'post': Post.objects.filter(author=reader).first(),
+    }
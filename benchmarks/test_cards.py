@@ -0,0 +1,42 @@
+"""Рендер страницы карточек: {% include %} на каждый пост и один проход."""
+import statistics
+import time
+
+import pytest
+from django.template import engines
+
+from posts.cards import render_cards
+from posts.models import Post
+from posts.tests.test_cards import INCLUDE_CARD
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.django_db(transaction=False),
+]
+
+PAGE_SIZE = 10
+
+
+def median_ms(render, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def test_card_render(bench_data, request):
+    rounds = request.config.getoption('--bench-rounds')
+    posts = list(Post.objects.feed()[:PAGE_SIZE])
+    include = engines['django'].from_string(
+        '{% for post in posts %}{% include card %}{% endfor %}')
+    card = engines['django'].from_string(INCLUDE_CARD).template
+    context = {'posts': posts, 'card': card}
+    assert ''.join(render_cards(posts)) == include.render(context)
+
+    per_include = median_ms(lambda: include.render(context), rounds)
+    single_pass = median_ms(lambda: render_cards(posts), rounds)
+    print(f'\ninclude: {per_include:.3f} ms/стр., '
+          f'один проход: {single_pass:.3f} ms/стр.')
+    assert single_pass <= per_include * 1.1
@@ -0,0 +1,139 @@
+"""Чтения и записи в SQLite из нескольких потоков одновременно.
+
+Одна и та же нагрузка идёт на две файловые базы: с настройками SQLite
+по умолчанию и с профилем из core.db (WAL, synchronous=NORMAL, mmap,
+большой кеш, busy timeout и повтор при блокировке).
+"""
+import os
+import threading
+import time
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connections
+
+pytestmark = pytest.mark.benchmark
+
+READERS = 4
+WRITERS = 2
+SEED_POSTS = 2000
+FEED_SQL = (
+    'SELECT p.id, p.text, p.pub_date, u.username FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id '
+    'ORDER BY p.pub_date DESC, p.id DESC LIMIT 10'
+)
+INSERT_SQL = (
+    "INSERT INTO posts_post (text, pub_date, author_id) "
+    "VALUES (%s, datetime('now'), %s)"
+)
+COUNT_SQL = (
+    'UPDATE posts_authorstats SET posts_count = posts_count + 1 '
+    'WHERE user_id = %s'
+)
+PROFILES = {
+    'default': {'PRAGMAS': {}, 'BUSY_RETRIES': 0},
+    'tuned': {'OPTIONS': settings.DATABASES['default']['OPTIONS']},
+}
+
+
+def prepare(alias):
+    call_command('migrate', database=alias, verbosity=0)
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO auth_user (password, is_superuser, username, "
+            "first_name, last_name, email, is_staff, is_active, date_joined) "
+            "VALUES ('', 0, 'bench', '', '', '', 0, 1, datetime('now'))")
+        author_id = cursor.lastrowid
+        cursor.execute(
+            'INSERT INTO posts_authorstats (user_id, posts_count) '
+            'VALUES (%s, 0)', [author_id])
+        cursor.executemany(INSERT_SQL, [
+            (f'post {num}', author_id) for num in range(SEED_POSTS)])
+    connections[alias].close()
+    return author_id
+
+
+def read(cursor, author_id):
+    cursor.execute(FEED_SQL)
+    cursor.fetchall()
+
+
+def write(cursor, author_id):
+    # Как post_create: пост и счётчик автора отдельными запросами
+    cursor.execute(INSERT_SQL, ['new post', author_id])
+    cursor.execute(COUNT_SQL, [author_id])
+
+
+def worker(alias, action, author_id, deadline, totals, lock):
+    done = errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                with connections[alias].cursor() as cursor:
+                    action(cursor, author_id)
+                done += 1
+            except OperationalError:
+                errors += 1
+    finally:
+        connections[alias].close()
+    with lock:
+        totals[action.__name__] += done
+        totals['errors'] += errors
+
+
+def run_load(alias, author_id, seconds):
+    totals = {'read': 0, 'write': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(alias, action, author_id, deadline, totals, lock))
+        for action in [read] * READERS + [write] * WRITERS
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'reads_per_s': round(totals['read'] / seconds),
+        'writes_per_s': round(totals['write'] / seconds),
+        'errors': totals['errors'],
+    }
+
+
+@pytest.fixture
+def sqlite_alias(django_db_blocker, tmp_path):
+    aliases = []
+
+    def make(name, overrides):
+        alias = f'bench_{name}'
+        connections.databases[alias] = dict(
+            {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(str(tmp_path), f'{name}.sqlite3'),
+            },
+            **overrides,
+        )
+        aliases.append(alias)
+        return alias
+
+    with django_db_blocker.unblock():
+        yield make
+        for alias in aliases:
+            connections[alias].close()
+            del connections.databases[alias]
+
+
+def test_sqlite_concurrency(sqlite_alias, request):
+    seconds = request.config.getoption('--bench-seconds')
+    results = {}
+    for name, overrides in PROFILES.items():
+        alias = sqlite_alias(name, overrides)
+        results[name] = run_load(alias, prepare(alias), seconds)
+    print()
+    for name, result in results.items():
+        print(f'{name:>8}: {result}')
+    assert results['tuned']['errors'] == 0, results
+    assert results['tuned']['writes_per_s'] > 0, results
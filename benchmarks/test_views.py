@@ -0,0 +1,102 @@
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from django.urls import resolve, reverse
+
+from core.page_cache import GLOBAL_SCOPE, bump_page_generations
+from posts.urls import urlpatterns as posts_urls
+from users.urls import urlpatterns as users_urls
+from .measure import measure, read
+
+pytestmark = [
+    pytest.mark.benchmark(threshold=1.0),
+    pytest.mark.django_db(transaction=False),
+]
+
+POST_ONLY = {
+    'posts:profile_follow', 'posts:profile_unfollow',
+    'posts:group_follow', 'posts:group_unfollow',
+}
+RELOGIN = {'users:logout'}
+EVENTS = {'posts:index_events', 'posts:group_events', 'posts:profile_events'}
+EXPORT_TOKEN = 'bench-export-token'
+STREAMING = EVENTS | {'posts:api_export'}
+# Маршруты, которые в замере отвечают не 200
+STATUS = {name: HTTPStatus.FOUND for name in POST_ONLY}
+ROUTES = (
+    [f'posts:{pattern.name}' for pattern in posts_urls]
+    + [f'users:{pattern.name}' for pattern in users_urls]
+)
+
+
+def route_kwargs(name, data):
+    pattern = next(
+        pattern for pattern in posts_urls + users_urls
+        if name.endswith(f':{pattern.name}')
+    )
+    values = {
+        'slug': data['group'].slug,
+        'username': data['author'].username,
+        'post_id': data['post'].id,
+        'uidb64': 'MQ',
+        'token': 'set-password',
+    }
+    return {name: values[name] for name in pattern.pattern.converters}
+
+
+def route_request(name, url, client):
+    """Запрос маршрута, который возвращает прочитанный ответ."""
+    if name in POST_ONLY:
+        return lambda: client.post(url)
+    params, headers, chunks = {}, {}, None
+    if name in EVENTS:
+        # С since=0 первое событие приходит сразу: retry и posts
+        params, chunks = {'since': 0}, 2
+    if name == 'posts:api_export':
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {EXPORT_TOKEN}'
+
+    def run():
+        response = client.get(url, params, **headers)
+        read(response, chunks)
+        return response
+    return run
+
+
+@pytest.mark.parametrize('name', ROUTES)
+@mock.patch('posts.api.API_EXPORT_TOKEN', EXPORT_TOKEN)
+def test_view_benchmark(name, bench_data, bench_client, check_benchmark,
+                        request):
+    url = reverse(name, kwargs=route_kwargs(name, bench_data))
+
+    def prepare():
+        # Замер без страничного кеша: иначе ленты API и RSS — 0 запросов
+        bump_page_generations(GLOBAL_SCOPE)
+        if name in RELOGIN:
+            bench_client.force_login(bench_data['reader'])
+    result = measure(
+        route_request(name, url, bench_client),
+        rounds=request.config.getoption('--bench-rounds'),
+        prepare=prepare,
+        status=STATUS.get(name, HTTPStatus.OK),
+    )
+    view = resolve(url).func
+    # @query_budget считает запросы самой view, а потоковый ответ
+    # читает базу и после неё: такие маршруты сверяются с baseline
+    budget = None if name in STREAMING else getattr(
+        view, 'query_budget', None)
+    check_benchmark(name, result, budget)
+
+
+@pytest.mark.parametrize('name', ['posts:post_create', 'posts:post_edit'])
+def test_form_post_benchmark(name, bench_data, bench_client, check_benchmark,
+                             request):
+    url = reverse(name, kwargs=route_kwargs(name, bench_data))
+    form_data = {'text': 'Текст из замера', 'group': bench_data['group'].id}
+    result = measure(
+        lambda: bench_client.post(url, data=form_data),
+        rounds=request.config.getoption('--bench-rounds'),
+        status=HTTPStatus.FOUND,
+    )
+    budget = getattr(resolve(url).func, 'query_budget', None)
+    check_benchmark(f'{name}:post', result, budget)
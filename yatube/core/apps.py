@@ -1,5 +1,24 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import mail  # noqa: F401
+        from .auth import invalidate, invalidate_on_logout
+        from .db import check_connections, configure_connection
+        from .routers import install as install_routing
+        from .slow_queries import install
+        connection_created.connect(configure_connection)
+        connection_created.connect(install)
+        connection_created.connect(install_routing)
+        request_started.connect(check_connections)
+        post_save.connect(invalidate, sender=get_user_model())
+        post_delete.connect(invalidate, sender=get_user_model())
+        user_logged_out.connect(invalidate_on_logout)
@@ -0,0 +1,99 @@
+"""Кеш пользователя запроса.
+
+AuthenticationMiddleware на каждый запрос читает пользователя из базы.
+Здесь на AUTH_USER_CACHE_SECONDS кешируются только поля, нужные
+шаблонам и проверкам доступа, и хеш сессии; пароль в кеш не попадает,
+при обращении к нему пользователь дочитывается из базы. Хеш сессии
+сверяется с закешированным: после смены пароля старые сессии
+разлогиниваются так же, как без кеша. Запись пользователя и выход
+сбрасывают кеш.
+
+Сброс доходит до других процессов только через общий кеш, поэтому
+с локальным бэкендом (LocMemCache) слой выключен, если не выставлен
+AUTH_USER_CACHE_LOCAL — это допустимо только для одного процесса.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.crypto import constant_time_compare
+
+AUTH_USER_CACHE_SECONDS = getattr(settings, 'AUTH_USER_CACHE_SECONDS', 300)
+AUTH_USER_CACHE_LOCAL = getattr(settings, 'AUTH_USER_CACHE_LOCAL', False)
+CACHED_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def enabled():
+    return AUTH_USER_CACHE_LOCAL or not isinstance(
+        caches['default'], LocMemCache)
+
+
+def build_record(user):
+    record = {field: getattr(user, field) for field in CACHED_FIELDS}
+    record['session_hash'] = user.get_session_auth_hash()
+    record['usable_password'] = user.has_usable_password()
+    return record
+
+
+def load_user(record):
+    """Пользователь с отложенными остальными полями, без запроса."""
+    user_model = auth.get_user_model()
+    # from_db ждёт значения в порядке полей модели
+    fields = [field.attname for field in user_model._meta.concrete_fields
+              if field.attname in CACHED_FIELDS]
+    user = user_model.from_db(
+        None, fields, [record[field] for field in fields])
+    # Шапка админки спрашивает это на каждой странице: без чтения пароля
+    usable = record['usable_password']
+    user.has_usable_password = lambda: usable
+    return user
+
+
+def session_verified(request, record):
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    return bool(session_hash) and constant_time_compare(
+        session_hash, record['session_hash'])
+
+
+def get_user(request):
+    """Как django.contrib.auth.get_user, но с пользователем из кеша."""
+    if not enabled():
+        return auth.get_user(request)
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    record = cache.get(user_key(user_id))
+    if record is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(user_key(user.pk), build_record(user),
+                      AUTH_USER_CACHE_SECONDS)
+        return user
+    if not session_verified(request, record):
+        request.session.flush()
+        return AnonymousUser()
+    user = load_user(record)
+    user.backend = backend_path
+    return user
+
+
+def invalidate(sender, instance, **kwargs):
+    """post_save/post_delete пользователя: профиль или пароль изменились."""
+    cache.delete(user_key(instance.pk))
+
+
+def invalidate_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        cache.delete(user_key(user.pk))
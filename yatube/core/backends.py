@@ -0,0 +1,47 @@
+"""Бэкенды шаблонов и кеша, которые пишут статистику Server-Timing."""
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import timing
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timing.timed_template():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который замеряет рендер и контекст-процессоры."""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.engine.template_context_processors = tuple(
+            timing.timed_processor(processor)
+            for processor in self.engine.template_context_processors
+        )
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class CountingCacheMixin:
+    """Считает попадания и промахи get/get_many для Server-Timing."""
+
+    def get(self, key, default=None, version=None):
+        return timing.counted_get(super().get, key, default, version)
+
+    def get_many(self, keys, version=None):
+        return timing.counted_get_many(super().get_many, keys, version)
+
+
+class CountingLocMemCache(CountingCacheMixin, LocMemCache):
+    pass
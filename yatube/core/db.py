@@ -0,0 +1,96 @@
+"""Профиль соединений SQLite для нагрузки с несколькими писателями.
+
+PRAGMA выставляются на каждое новое соединение через connection_created,
+их можно переопределить для отдельной базы ключом PRAGMAS в DATABASES
+(пустой словарь отключает настройку). Запросы вне транзакции, упавшие
+с «database is locked», повторяются с экспоненциальной паузой, пока
+общее ожидание не превысит SQLITE_BUSY_MAX_WAIT секунд.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+SQLITE_PRAGMAS = getattr(settings, 'SQLITE_PRAGMAS', {
+    # Читатели не блокируют писателя и наоборот
+    'journal_mode': 'WAL',
+    # В режиме WAL безопасно: fsync только на checkpoint
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, здесь 64 МиБ
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+})
+SQLITE_BUSY_RETRIES = getattr(settings, 'SQLITE_BUSY_RETRIES', 5)
+SQLITE_BUSY_BACKOFF = getattr(settings, 'SQLITE_BUSY_BACKOFF', 0.05)
+# Сколько секунд всего ждать с учётом busy timeout каждой попытки
+SQLITE_BUSY_MAX_WAIT = getattr(settings, 'SQLITE_BUSY_MAX_WAIT', 10)
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_busy(execute, sql, params, many, context):
+    """Повторяет запрос при SQLITE_BUSY.
+
+    Внутри atomic() повторять нельзя: транзакция уже могла прочитать
+    устаревший снимок, поэтому ошибка уходит наверх сразу. Каждая
+    попытка сама ждёт busy timeout, поэтому повторы ограничены и общим
+    временем: BUSY_MAX_WAIT в настройках базы или SQLITE_BUSY_MAX_WAIT.
+    """
+    connection = context['connection']
+    retries = connection.settings_dict.get(
+        'BUSY_RETRIES', SQLITE_BUSY_RETRIES)
+    deadline = time.monotonic() + connection.settings_dict.get(
+        'BUSY_MAX_WAIT', SQLITE_BUSY_MAX_WAIT)
+    for attempt in range(retries + 1):
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            if (attempt == retries or connection.in_atomic_block
+                    or not is_busy(error)):
+                raise
+            pause = SQLITE_BUSY_BACKOFF * 2 ** attempt * random.uniform(1, 2)
+            if time.monotonic() + pause > deadline:
+                raise
+        time.sleep(pause)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA и повтор при блокировке."""
+    if connection.vendor != 'sqlite':
+        return
+    if retry_busy not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, retry_busy)
+    if connection.is_in_memory_db():
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS', SQLITE_PRAGMAS)
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_healthy(connection):
+    if connection.vendor != 'sqlite':
+        return connection.is_usable()
+    # У SQLite is_usable() всегда True, проверяем само соединение
+    try:
+        connection.connection.execute('SELECT 1')
+    except Exception:
+        return False
+    return True
+
+
+def check_connections(**kwargs):
+    """Обработчик request_started: закрывает сломанные постоянные соединения.
+
+    Работает для баз с CONN_HEALTH_CHECKS, как в Django 4.1, и не трогает
+    соединения, которые ещё не открывались в этом потоке.
+    """
+    for connection in connections.all():
+        if (connection.connection is not None
+                and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not is_healthy(connection)):
+            connection.close()
@@ -0,0 +1,10 @@
+def query_budget(queries):
+    """Объявляет максимум SQL-запросов на один запрос к view.
+
+    Бюджет считается для авторизованного пользователя, то есть вместе
+    с чтением сессии и пользователя. Проверяется QueryBudgetMixin.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
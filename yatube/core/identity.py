@@ -0,0 +1,78 @@
+"""Карта загруженных объектов на время одного запроса.
+
+Декораторы, view и теги шаблонов берут объекты через карту запроса,
+поэтому каждая строка читается из базы не больше одного раза:
+
+    post = identity_map(request).get_or_404(Post, post_id)
+"""
+from django.http import Http404
+
+
+class IdentityMap:
+    def __init__(self):
+        self.objects = {}
+
+    @staticmethod
+    def key(model, pk):
+        return model._meta.label, str(pk)
+
+    def add(self, obj):
+        # __class__, а не type(): request.user — SimpleLazyObject
+        self.objects[self.key(obj.__class__, obj.pk)] = obj
+        return obj
+
+    def discard(self, model, pk):
+        self.objects.pop(self.key(model, pk), None)
+
+    def get_many(self, model, pks):
+        """{pk: объект} для найденных pk; недостающие одним запросом."""
+        pks = set(pks) - {None}
+        missing = [pk for pk in pks if self.key(model, pk) not in self.objects]
+        if missing:
+            for obj in model._default_manager.filter(pk__in=missing):
+                self.add(obj)
+            for pk in missing:
+                # Отсутствие строки тоже запоминается
+                self.objects.setdefault(self.key(model, pk), None)
+        return {
+            pk: self.objects[self.key(model, pk)] for pk in pks
+            if self.objects[self.key(model, pk)] is not None
+        }
+
+    def get(self, model, pk):
+        return self.get_many(model, [pk]).get(pk)
+
+    def get_or_404(self, model, pk):
+        obj = self.get(model, pk)
+        if obj is None:
+            raise Http404(f'{model._meta.verbose_name} не найден')
+        return obj
+
+    def load_related(self, objects, field_name):
+        """Заполняет внешний ключ field_name у objects одним запросом."""
+        field = objects[0]._meta.get_field(field_name) if objects else None
+        if field is None:
+            return objects
+        related = self.get_many(
+            field.related_model,
+            [getattr(obj, field.attname) for obj in objects])
+        for obj in objects:
+            target = related.get(getattr(obj, field.attname))
+            if target is not None:
+                setattr(obj, field_name, target)
+        return objects
+
+
+def identity_map(request):
+    """Карта текущего запроса, создаётся при первом обращении.
+
+    Авторизованный пользователь запроса сразу лежит в карте.
+    """
+    try:
+        return request.identity_map
+    except AttributeError:
+        request.identity_map = IdentityMap()
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            request.identity_map.add(user)
+        return request.identity_map
@@ -0,0 +1,106 @@
+"""Отправка писем через очередь задач.
+
+QueuedEmailBackend только кладёт в очередь каждое письмо отдельной
+задачей, а send_emails в исполнителе отправляет всю пачку через
+TASKS_EMAIL_BACKEND одним соединением. Упавшее письмо повторяется
+само, отправленные повторно не уходят.
+
+Письма с секретами в очередь не кладутся: send_password_reset получает
+id пользователя и строит ссылку с токеном уже в исполнителе.
+"""
+import traceback
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .tasks import PartialFailure, task
+
+TASKS_EMAIL_BACKEND = getattr(
+    settings, 'TASKS_EMAIL_BACKEND',
+    'django.core.mail.backends.smtp.EmailBackend')
+
+
+def dump_message(message):
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+def load_message(data):
+    data = dict(data, alternatives=[
+        tuple(alternative) for alternative in data['alternatives']])
+    return EmailMultiAlternatives(**data)
+
+
+def email_connection():
+    return get_connection(TASKS_EMAIL_BACKEND, fail_silently=False)
+
+
+@task(max_attempts=5, batch=True)
+def send_emails(payloads):
+    failed = {}
+    with email_connection() as connection:
+        for number, payload in enumerate(payloads):
+            try:
+                connection.send_messages([
+                    load_message(message)
+                    for message in payload['messages']])
+            except Exception:
+                failed[number] = traceback.format_exc()
+    if failed:
+        raise PartialFailure(failed)
+
+
+@task(max_attempts=5)
+def send_password_reset(user_id, domain, site_name, use_https,
+                        subject_template_name, email_template_name,
+                        html_email_template_name=None, from_email=None,
+                        extra_email_context=None):
+    """Письмо PasswordResetForm; токен создаётся здесь, а не в запросе."""
+    user = get_user_model()._default_manager.filter(
+        pk=user_id, is_active=True).first()
+    if user is None:
+        return
+    context = {
+        'email': user.email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+    }
+    context.update(extra_email_context or {})
+    subject = ''.join(
+        loader.render_to_string(subject_template_name, context).splitlines())
+    message = EmailMultiAlternatives(
+        subject, loader.render_to_string(email_template_name, context),
+        from_email, [user.email])
+    if html_email_template_name is not None:
+        message.attach_alternative(
+            loader.render_to_string(html_email_template_name, context),
+            'text/html')
+    with email_connection() as connection:
+        connection.send_messages([message])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        # По задаче на письмо: успех и повтор у каждого свой
+        for message in email_messages:
+            send_emails.delay(messages=[dump_message(message)])
+        return len(email_messages)
@@ -0,0 +1,9 @@
+from django.core.management.commands import migrate
+
+from core import routers
+
+
+class Command(migrate.Command):
+    def handle(self, *args, **options):
+        with routers.migration(options['database']):
+            return super().handle(*args, **options)
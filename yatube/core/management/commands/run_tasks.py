@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import TASKS_BATCH_SIZE, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Исполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--batch-size', type=int,
+                            default=TASKS_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='пауза в секундах, когда очередь пуста')
+        parser.add_argument('--until-empty', action='store_true',
+                            help='выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        self.stdout.write(
+            f"Исполнитель запущен, потоков: {options['threads']}")
+        run_worker(
+            threads=options['threads'],
+            limit=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            until_empty=options['until_empty'],
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import DATABASE_REPLICAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплики из YATUBE_REPLICA_DB: '
+            'локальная замена репликации')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite')
+        if not DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'YATUBE_REPLICA_DB')
+        primary.ensure_connection()
+        for alias in DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            replica.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: {replica.settings_dict["NAME"]}'))
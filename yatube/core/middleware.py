@@ -0,0 +1,88 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from core import auth, routers, timing
+
+# Доля запросов, для которых собирается Server-Timing: 0 выключает сбор
+SERVER_TIMING_SAMPLE_RATE = getattr(
+    settings, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+REPLICA_STICKY_COOKIE = 'primary_db'
+
+
+class ServerTimingMiddleware:
+    """Пишет в заголовок Server-Timing, куда ушло время запроса.
+
+    Считает число и время SQL-запросов, рендер шаблонов, контекст-
+    процессоры, время view и попадания в кеш. Должен стоять первым
+    в MIDDLEWARE, чтобы total включал остальные middleware. Заголовок
+    получают только запросы с адресов из INTERNAL_IPS и сотрудники.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with timing.collect() as stats, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats.execute))
+            response = self.get_response(request)
+            view_started = getattr(request, '_server_timing_view', None)
+            if view_started is not None:
+                stats.view_time = time.perf_counter() - view_started
+        if self.allowed(request):
+            response['Server-Timing'] = stats.header(
+                time.perf_counter() - started)
+        return response
+
+    def allowed(self, request):
+        if request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if timing.current_stats() is not None:
+            request._server_timing_view = time.perf_counter()
+
+
+class ReplicaStickinessMiddleware:
+    """Держит пользователя на основной базе после записи.
+
+    Если за запрос была запись, ответ ставит cookie на
+    REPLICA_STICKY_SECONDS; пока она жива, ReplicaRouter не отдаёт
+    чтения репликам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset(pinned=REPLICA_STICKY_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            wrote = routers.has_written()
+        finally:
+            routers.reset()
+        if wrote and routers.DATABASE_REPLICAS:
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE, '1', max_age=REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware с пользователем из кеша core.auth."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: auth.get_user(request))
@@ -0,0 +1,131 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from core.context_processors.year import year
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+GLOBAL_SCOPE = 'all'
+
+
+def generation_key(scope):
+    return f'page_cache:generation:{scope}'
+
+
+def generation_time(generation):
+    modified, _, _ = generation.partition('.')
+    return int(modified) if modified.isdigit() else 0
+
+
+def new_generation(previous=None):
+    """Поколение «время смены.случайный номер».
+
+    Время растёт строго: иначе правка в ту же секунду, что и прошлая,
+    отдала бы клиенту 304 по If-Modified-Since.
+    """
+    modified = int(time.time())
+    if previous is not None:
+        modified = max(modified, generation_time(previous) + 1)
+    return f'{modified}.{uuid.uuid4().hex[:8]}'
+
+
+def bump_page_generations(*scopes):
+    """Делает устаревшими все закешированные страницы этих областей.
+
+    Сброс повторяется после коммита: другой процесс мог закешировать
+    страницу с данными до него.
+    """
+    keys = [generation_key(scope) for scope in scopes]
+
+    def bump():
+        current = cache.get_many(keys)
+        cache.set_many(
+            {key: new_generation(current.get(key)) for key in keys}, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_generations(scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = {
+        key: new_generation() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def page_key(request, generations):
+    # Схема и хост в ключе: RSS и Atom строят из них абсолютные ссылки
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return 'page_cache:page:{}:{}:{}'.format(
+        url, year(request)['year'], ':'.join(generations))
+
+
+def conditional_response(request, entry, response, vary_cookie=True):
+    response['ETag'] = entry['etag']
+    last_modified = entry.get('last_modified')
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if vary_cookie:
+        patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=last_modified,
+        response=response)
+
+
+def page_cache(get_scopes, anonymous_only=True, last_modified=False):
+    """Кеширует ответ на GET-запрос до смены поколений его областей.
+
+    get_scopes(**kwargs) возвращает области, от поколений которых
+    зависит страница; bump_page_generations сбрасывает их. Повторный
+    запрос с If-None-Match получает 304. Если
+    ответ не зависит от пользователя, anonymous_only=False кеширует
+    его для всех. last_modified=True добавляет Last-Modified — время
+    последней смены поколения — и 304 по If-Modified-Since.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or (
+                    anonymous_only and request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            generations = get_generations(
+                [GLOBAL_SCOPE, *get_scopes(**kwargs)])
+            key = page_key(request, generations)
+            entry = cache.get(key)
+            if entry is not None:
+                response = HttpResponse(
+                    entry['content'], content_type=entry['content_type'])
+                return conditional_response(
+                    request, entry, response, anonymous_only)
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(
+                    hashlib.md5(response.content).hexdigest()),
+            }
+            if last_modified:
+                entry['last_modified'] = max(map(generation_time, generations))
+            cache.set(key, entry, PAGE_CACHE_TIMEOUT)
+            return conditional_response(
+                request, entry, response, anonymous_only)
+        return wrapper
+    return decorator
+
+
+def anonymous_page_cache(get_scopes):
+    """Кеширует страницу для анонимных GET-запросов, см. page_cache."""
+    return page_cache(get_scopes)
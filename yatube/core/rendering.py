@@ -0,0 +1,24 @@
+"""Рендер списков одним проходом по скомпилированному шаблону."""
+from django.template import Context
+from django.template.loader import get_template
+
+
+def render_each(template_name, items, as_name, extra_context=None):
+    """Рендерит шаблон для каждого элемента списка за один проход.
+
+    В отличие от {% include %} в цикле, шаблон загружается один раз,
+    а контекст один на весь список: на каждый элемент в него кладётся
+    только сам элемент и словарь extra_context(item). Возвращает список
+    строк в порядке items.
+    """
+    compiled = get_template(template_name).template
+    context = Context()
+    rendered = []
+    with context.bind_template(compiled):
+        for item in items:
+            values = {as_name: item}
+            if extra_context is not None:
+                values.update(extra_context(item))
+            with context.push(values):
+                rendered.append(compiled.render(context))
+    return rendered
@@ -0,0 +1,110 @@
+"""Чтение с реплик, запись в основную базу.
+
+После записи в таблицы REPLICA_READ_APPS поток «прилипает» к основной
+базе до конца запроса, а ReplicaStickinessMiddleware продлевает это на
+REPLICA_STICKY_SECONDS через cookie, чтобы пользователь видел свои
+изменения, пока реплика догоняет основную базу. Записи в прочие
+приложения (сессии, задачи) читаются только с основной базы и поток
+не прилепляют. Состояние потока сбрасывает middleware на каждый
+запрос, а исполнитель задач и команды — через scope().
+
+Запись распознаётся по выполненному SQL (track_writes), а не по
+db_for_write: Django зовёт его и при присваивании связей несохранённым
+объектам, например при сборке поста из кеша.
+
+Во время migrate все запросы без using() идут в мигрируемую базу:
+старые миграции данных не передают alias сами.
+"""
+import contextlib
+import random
+import re
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DATABASE_REPLICAS = getattr(settings, 'DATABASE_REPLICAS', [])
+REPLICA_READ_APPS = getattr(settings, 'REPLICA_READ_APPS', ['posts'])
+
+REPLICA_TABLE_PREFIXES = tuple(f'{label}_' for label in REPLICA_READ_APPS)
+WRITE_SQL = re.compile(
+    r'\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE|'
+    r'DELETE\s+FROM)\s+"?(\w+)', re.IGNORECASE)
+
+_state = threading.local()
+
+
+def reset(pinned=False):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def migrating():
+    return getattr(_state, 'migrating', None)
+
+
+@contextlib.contextmanager
+def migration(using):
+    """Запросы без using() идут в using, пока идёт migrate, даже с ошибкой."""
+    previous = migrating()
+    _state.migrating = using
+    try:
+        yield
+    finally:
+        _state.migrating = previous
+
+
+def track_writes(execute, sql, params, many, context):
+    """Обёртка запросов: запись в реплицируемую таблицу прилепляет поток."""
+    result = execute(sql, params, many, context)
+    match = WRITE_SQL.match(sql)
+    if match and match.group(1).startswith(REPLICA_TABLE_PREFIXES):
+        _state.pinned = _state.wrote = True
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_writes)
+
+
+@contextlib.contextmanager
+def scope(pinned=False):
+    """Своё состояние на время задачи или команды, годится и декоратором."""
+    reset(pinned)
+    try:
+        yield
+    finally:
+        reset()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if migrating():
+            return migrating()
+        if (not DATABASE_REPLICAS or is_pinned()
+                or model._meta.app_label not in REPLICA_READ_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if migrating():
+            return migrating()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На всех базах одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in DATABASE_REPLICAS
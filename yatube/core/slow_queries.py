@@ -0,0 +1,147 @@
+"""Журнал медленных SQL-запросов с планами SQLite.
+
+Обёртка ставится на каждое новое соединение с базой. Запросы дольше
+SLOW_QUERY_THRESHOLD_MS попадают в кольцевой буфер вместе с нормализованным
+текстом, местом вызова в коде проекта и выводом EXPLAIN QUERY PLAN.
+"""
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+
+from django.conf import settings
+
+from core import db, routers, timing
+
+# None выключает журнал
+SLOW_QUERY_THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+SLOW_QUERY_LOG_SIZE = getattr(settings, 'SLOW_QUERY_LOG_SIZE', 200)
+
+_log = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_lock = threading.Lock()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?|%s)(?:, (?:\?|%s))*\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT\b|SUBQUERY\b)(\w+)')
+# Обёртки execute, которые не считаются местом вызова
+_WRAPPER_FILES = {__file__, timing.__file__, db.__file__, routers.__file__}
+
+
+def fingerprint(sql):
+    """SQL без литералов: одинаковые запросы с разными данными совпадают."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def call_site():
+    """Последний кадр стека из кода проекта, а не Django и не библиотек."""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if (filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in filename
+                and filename not in _WRAPPER_FILES):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """Строки EXPLAIN QUERY PLAN; пустой список для не-SELECT и не-SQLite."""
+    if (connection.vendor != 'sqlite'
+            or not sql.lstrip().upper().startswith('SELECT')):
+        return []
+    # Курсор без обёрток: результат исходного запроса ещё не прочитан
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception:
+        return []
+    finally:
+        cursor.close()
+
+
+def full_scans(plan):
+    """Таблицы, которые план читает целиком: SCAN, даже по индексу."""
+    tables = []
+    for line in plan:
+        match = _FULL_SCAN.match(line)
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def log_slow_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if (SLOW_QUERY_THRESHOLD_MS is not None
+                and duration >= SLOW_QUERY_THRESHOLD_MS):
+            record(context['connection'], sql, params, many, duration)
+
+
+def record(connection, sql, params, many, duration):
+    plan = [] if many else explain(connection, sql, params)
+    entry = {
+        'fingerprint': fingerprint(sql),
+        'sql': sql,
+        'duration': duration,
+        'call_site': call_site(),
+        'plan': plan,
+        'full_scans': full_scans(plan),
+        'database': connection.alias,
+    }
+    with _lock:
+        _log.append(entry)
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created.
+
+    Обёртка ставится в начало списка, но внутрь retry_busy, чтобы паузы
+    между повторами не считались временем запроса: execute_wrapper()
+    снимает последнюю обёртку, а соединение может открыться внутри него.
+    """
+    wrappers = connection.execute_wrappers
+    if log_slow_query not in wrappers:
+        position = 0
+        if db.retry_busy in wrappers:
+            position = wrappers.index(db.retry_busy) + 1
+        wrappers.insert(position, log_slow_query)
+
+
+def entries():
+    with _lock:
+        return list(_log)
+
+
+def clear():
+    with _lock:
+        _log.clear()
+
+
+def summary():
+    """Записи, сгруппированные по отпечатку, самые дорогие первыми."""
+    groups = {}
+    for entry in entries():
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'count': 0,
+            'total': 0.0,
+            'max': 0.0,
+        })
+        group['count'] += 1
+        group['total'] += entry['duration']
+        if entry['duration'] >= group['max']:
+            group['max'] = entry['duration']
+            group['slowest'] = entry
+    return sorted(groups.values(), key=lambda group: -group['total'])
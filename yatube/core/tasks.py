@@ -0,0 +1,214 @@
+"""Локальная очередь фоновых задач в базе.
+
+Задача — строка в core_task, поэтому delay() внутри transaction.atomic()
+ставит её вместе с записью: если запись откатится, задачи тоже не будет.
+Вне транзакции задача пишется отдельным запросом. Post.save атомарен,
+и раскладка из post_save ставится в одной транзакции с постом.
+Исполняет задачи manage.py run_tasks: берёт пачку готовых, раздаёт по
+потокам ThreadPoolExecutor и повторяет упавшие с растущей паузой.
+Выполненные задачи удаляются через TASKS_KEEP_DONE секунд.
+
+    @task(max_attempts=5)
+    def fan_out_post(post_id):
+        ...
+
+    fan_out_post.delay(post_id=post.pk)
+"""
+import datetime
+import json
+import logging
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import routers
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS_BATCH_SIZE = getattr(settings, 'TASKS_BATCH_SIZE', 50)
+TASKS_RETRY_DELAY = getattr(settings, 'TASKS_RETRY_DELAY', 10)
+# Задача, взятая дольше этого времени назад, считается брошенной
+TASKS_LOCK_TIMEOUT = getattr(settings, 'TASKS_LOCK_TIMEOUT', 10 * 60)
+TASKS_KEEP_DONE = getattr(settings, 'TASKS_KEEP_DONE', 7 * 24 * 60 * 60)
+# Как часто простаивающий исполнитель удаляет старые выполненные задачи
+TASKS_PURGE_INTERVAL = getattr(settings, 'TASKS_PURGE_INTERVAL', 60 * 60)
+
+registry = {}
+
+
+class PartialFailure(Exception):
+    """Batch-задача выполнила не все kwargs из пачки.
+
+    failed — словарь {номер в пачке: текст ошибки}; остальные задачи
+    пачки считаются выполненными и не повторяются.
+    """
+
+    def __init__(self, failed):
+        super().__init__(f'Не выполнено {len(failed)} из пачки')
+        self.failed = failed
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, batch):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.batch = batch
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **kwargs):
+        return Task.objects.create(
+            name=self.name, payload=json.dumps(kwargs))
+
+
+def task(max_attempts=3, batch=False):
+    """Регистрирует функцию как фоновую задачу.
+
+    С batch=True исполнитель вызывает функцию один раз на пачку задач
+    с одним аргументом — списком их kwargs.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, batch)
+        registry[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def claim(limit=TASKS_BATCH_SIZE):
+    """Забирает готовые задачи себе; безопасно при нескольких воркерах."""
+    now = timezone.now()
+    Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=now - datetime.timedelta(seconds=TASKS_LOCK_TIMEOUT),
+    ).update(status=Task.QUEUED, locked_by='')
+    ids = list(
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+        status=Task.RUNNING, locked_by=token, locked_at=now)
+    return list(Task.objects.filter(locked_by=token, status=Task.RUNNING)
+                .order_by('name', 'id'))
+
+
+def finish(tasks):
+    Task.objects.filter(pk__in=[item.pk for item in tasks]).update(
+        status=Task.DONE, locked_by='')
+
+
+def purge_done(keep=TASKS_KEEP_DONE):
+    """Удаляет выполненные задачи старше keep секунд, возвращает их число."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=keep)
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, run_at__lt=cutoff).delete()
+    return deleted
+
+
+def fail(tasks, max_attempts, error):
+    for item in tasks:
+        item.attempts += 1
+        item.last_error = error
+        item.locked_by = ''
+        if item.attempts >= max_attempts:
+            item.status = Task.FAILED
+        else:
+            item.status = Task.QUEUED
+            item.run_at = timezone.now() + datetime.timedelta(
+                seconds=TASKS_RETRY_DELAY * 2 ** (item.attempts - 1))
+        item.save(update_fields=[
+            'attempts', 'last_error', 'locked_by', 'status', 'run_at'])
+
+
+@routers.scope(pinned=True)
+def execute(name, tasks):
+    """Выполняет пачку задач одного вида.
+
+    Задачи ставятся после записи, а реплика могла её ещё не получить,
+    поэтому задача читает с основной базы.
+    """
+    task_function = registry.get(name)
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {name} не зарегистрирована')
+        payloads = [json.loads(item.payload) for item in tasks]
+        if task_function.batch:
+            task_function(payloads)
+        else:
+            for payload in payloads:
+                task_function(**payload)
+    except PartialFailure as error:
+        logger.error('Задача %s: %s', name, error)
+        finish([item for number, item in enumerate(tasks)
+                if number not in error.failed])
+        for number, message in error.failed.items():
+            fail([tasks[number]], task_function.max_attempts, message)
+    except Exception:
+        logger.exception('Задача %s упала', name)
+        max_attempts = task_function.max_attempts if task_function else 1
+        fail(tasks, max_attempts, traceback.format_exc())
+    else:
+        finish(tasks)
+
+
+def execute_in_thread(name, tasks):
+    try:
+        execute(name, tasks)
+    finally:
+        # Соединения потока пула живут, пока не устареют по CONN_MAX_AGE
+        close_old_connections()
+
+
+def groups(tasks):
+    """Пачки для потоков: batch-задачи одного вида вместе, прочие по одной."""
+    for name, items in groupby(tasks, key=lambda item: item.name):
+        items = list(items)
+        task_function = registry.get(name)
+        if task_function is not None and task_function.batch:
+            yield name, items
+        else:
+            for item in items:
+                yield name, [item]
+
+
+def run_pending(executor=None, limit=TASKS_BATCH_SIZE):
+    """Выполняет одну пачку готовых задач, возвращает их число."""
+    tasks = claim(limit)
+    if executor is None:
+        for name, items in groups(tasks):
+            execute(name, items)
+    else:
+        futures = [executor.submit(execute_in_thread, name, items)
+                   for name, items in groups(tasks)]
+        for future in futures:
+            future.result()
+    return len(tasks)
+
+
+def run_worker(threads=4, limit=TASKS_BATCH_SIZE, poll_interval=1.0,
+               until_empty=False):
+    """Цикл исполнителя; с until_empty выходит, когда очередь пуста."""
+    purged_at = None
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            done = run_pending(executor, limit)
+            close_old_connections()
+            if done:
+                continue
+            now = time.monotonic()
+            if purged_at is None or now - purged_at > TASKS_PURGE_INTERVAL:
+                purge_done()
+                purged_at = now
+            if until_empty:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,22 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """Проверка, что view укладывается в бюджет из @query_budget."""
+
+    def assertWithinQueryBudget(self, client, path, method='get', **kwargs):
+        view = resolve(path).func
+        budget = getattr(view, 'query_budget', None)
+        if budget is None:
+            self.fail(f'view для {path} не объявляет @query_budget')
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(path, **kwargs)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{path}: {len(context)} SQL-запросов при бюджете {budget}\n'
+            f'{queries}'
+        )
+        return response
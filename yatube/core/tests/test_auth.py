@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import User
+from .. import auth
+from ..auth import user_key
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('user', password='old-password')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='user', password='old-password')
+        self.url = reverse('about:author')
+
+    def queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, len(context)
+
+    def test_warm_request_skips_session_and_user(self):
+        """повторный запрос не читает ни сессию, ни пользователя"""
+        response, _ = self.queries()
+        self.assertEqual(response.context['user'], self.user)
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+        response, queries = self.queries()
+        self.assertEqual(queries, 0)
+        self.assertEqual(response.context['user'].username, 'user')
+
+    def test_profile_edit_invalidates(self):
+        """изменение пользователя сбрасывает кеш"""
+        self.queries()
+        User.objects.filter(pk=self.user.pk).update(first_name='Лев')
+        response, _ = self.queries()
+        self.assertEqual(response.context['user'].first_name, '')
+        user = User.objects.get(pk=self.user.pk)
+        user.save()
+        response, _ = self.queries()
+        self.assertEqual(response.context['user'].first_name, 'Лев')
+
+    def test_password_change_logs_out_other_sessions(self):
+        """после смены пароля старая сессия больше не авторизована"""
+        self.queries()
+        other = self.client_class()
+        other.login(username='user', password='old-password')
+        other.post(reverse('users:password_change'), {
+            'old_password': 'old-password',
+            'new_password1': 'new-Pa55word',
+            'new_password2': 'new-Pa55word',
+        })
+        response, _ = self.queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+        response = other.get(self.url)
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_stale_cached_hash_is_rejected(self):
+        """пользователь из кеша проходит ту же проверку хеша сессии"""
+        self.queries()
+        stale = User.objects.get(pk=self.user.pk)
+        stale.set_password('changed')
+        cache.set(user_key(self.user.pk), auth.build_record(stale))
+        response, _ = self.queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_password_is_not_cached(self):
+        """в кеше нет хеша пароля, он дочитывается при обращении"""
+        self.queries()
+        record = cache.get(user_key(self.user.pk))
+        self.assertNotIn('password', record)
+        self.assertNotIn(self.user.password, record.values())
+        user = auth.load_user(record)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('old-password'))
+
+    def test_local_cache_needs_opt_in(self):
+        """с LocMemCache без AUTH_USER_CACHE_LOCAL кеш не используется"""
+        with mock.patch.object(auth, 'AUTH_USER_CACHE_LOCAL', False):
+            self.queries()
+            self.assertIsNone(cache.get(user_key(self.user.pk)))
+
+    def test_logout_drops_cached_user(self):
+        """выход убирает пользователя из кеша"""
+        self.queries()
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from core import db
+
+
+class SqliteProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.connections = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+            'CONN_HEALTH_CHECKS': True,
+        }})
+        self.connection = self.connections['default']
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """новое соединение получает WAL, NORMAL, mmap и большой кеш"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('mmap_size'),
+                         db.SQLITE_PRAGMAS['mmap_size'])
+        self.assertEqual(self.pragma('cache_size'),
+                         db.SQLITE_PRAGMAS['cache_size'])
+
+    def test_pragmas_disabled(self):
+        """PRAGMAS={} в настройках базы оставляет значения SQLite"""
+        self.connection.settings_dict['PRAGMAS'] = {}
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
+
+    def test_health_check(self):
+        """сломанное постоянное соединение закрывается в начале запроса"""
+        self.connection.ensure_connection()
+        self.connection.connection.close()
+        with mock.patch('core.db.connections', self.connections):
+            db.check_connections()
+        self.assertIsNone(self.connection.connection)
+
+
+class RetryBusyTests(SimpleTestCase):
+    def setUp(self):
+        self.connection = mock.Mock(in_atomic_block=False, settings_dict={})
+        self.context = {'connection': self.connection}
+        sleep = mock.patch('core.db.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def run_retry(self, *outcomes):
+        execute = mock.Mock(side_effect=outcomes)
+        return db.retry_busy(execute, 'SQL', (), False, self.context), execute
+
+    def test_retries_locked(self):
+        """«database is locked» повторяется с растущей паузой"""
+        locked = OperationalError('database is locked')
+        result, execute = self.run_retry(locked, locked, 'rows')
+        self.assertEqual(result, 'rows')
+        self.assertEqual(execute.call_count, 3)
+        first, second = (call[0][0] for call in self.sleep.call_args_list)
+        self.assertLess(first, second)
+
+    def test_max_wait(self):
+        """повторы прекращаются, когда общее ожидание вышло за предел"""
+        self.connection.settings_dict['BUSY_MAX_WAIT'] = 5
+        locked = OperationalError('database is locked')
+        # Каждая попытка простояла busy timeout в 4 секунды
+        with mock.patch('core.db.time.monotonic',
+                        side_effect=[0, 4, 8]):
+            with self.assertRaises(OperationalError):
+                self.run_retry(locked, locked, 'rows')
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_no_retry_in_transaction(self):
+        """внутри atomic() ошибка уходит наверх сразу"""
+        self.connection.in_atomic_block = True
+        with self.assertRaises(OperationalError):
+            self.run_retry(OperationalError('database is locked'), 'rows')
+        self.sleep.assert_not_called()
+
+    def test_other_errors(self):
+        """прочие ошибки не повторяются"""
+        with self.assertRaises(OperationalError):
+            self.run_retry(OperationalError('no such table'), 'rows')
+        self.sleep.assert_not_called()
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from ..identity import IdentityMap, identity_map
+
+
+class IdentityMapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.other = User.objects.create_user('other')
+        cls.posts = [
+            Post.objects.create(text='first', author=cls.author),
+            Post.objects.create(text='second', author=cls.other),
+        ]
+
+    def test_each_row_loaded_once(self):
+        """строка читается один раз, в том числе отсутствующая"""
+        objects = IdentityMap()
+        with self.assertNumQueries(1):
+            post = objects.get(Post, self.posts[0].pk)
+            self.assertIs(objects.get(Post, str(self.posts[0].pk)), post)
+        with self.assertNumQueries(1):
+            self.assertIsNone(objects.get(Post, 999))
+            with self.assertRaises(Http404):
+                objects.get_or_404(Post, 999)
+
+    def test_get_many_loads_only_missing(self):
+        """get_many дочитывает одним запросом только новые pk"""
+        objects = IdentityMap()
+        objects.get(Post, self.posts[0].pk)
+        with self.assertNumQueries(1):
+            found = objects.get_many(Post, [post.pk for post in self.posts])
+        self.assertEqual(set(found), {post.pk for post in self.posts})
+
+    def test_load_related(self):
+        """авторы постов загружаются одним запросом"""
+        objects = IdentityMap()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            objects.load_related(posts, 'author')
+            authors = {post.author.username for post in posts}
+        self.assertEqual(authors, {'author', 'other'})
+
+    def test_request_user_is_preloaded(self):
+        """пользователь запроса уже лежит в карте"""
+        request = RequestFactory().get('/')
+        request.user = self.author
+        objects = identity_map(request)
+        self.assertIs(identity_map(request), objects)
+        with self.assertNumQueries(0):
+            self.assertIs(objects.get(User, self.author.pk), self.author)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(identity_map(request).objects, {})
+
+    def test_post_edit_reads_post_once(self):
+        """author_only и post_edit читают пост одним запросом"""
+        self.client.force_login(self.author)
+        url = reverse('posts:post_edit', kwargs={'post_id': self.posts[0].pk})
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.commands import migrate
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from core import routers
+from core.middleware import REPLICA_STICKY_COOKIE, ReplicaStickinessMiddleware
+from core.models import Task
+from posts.models import Post, User
+
+
+def write(model):
+    """Прогоняет UPDATE по таблице модели через обёртку запросов."""
+    routers.track_writes(
+        lambda *args: None, f'UPDATE "{model._meta.db_table}" SET id = 1',
+        (), False, {})
+
+
+@mock.patch('core.routers.DATABASE_REPLICAS', ['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_reads(self):
+        """чтения постов идут на реплику, остальные — на основную базу"""
+        self.assertEqual(Post.objects.all().db, 'replica_1')
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_writes_pin_primary(self):
+        """после записи чтения в этом потоке идут на основную базу"""
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(Post.objects.all().db, 'replica_1')
+        write(Post)
+        self.assertEqual(Post.objects.all().db, 'default')
+
+    def test_other_writes_do_not_pin(self):
+        """запись в сессии и задачи не уводит чтения постов с реплики"""
+        write(Task)
+        self.assertEqual(Post.objects.all().db, 'replica_1')
+        self.assertFalse(routers.has_written())
+
+    def test_scope_resets(self):
+        """scope() сбрасывает прилипание по выходе"""
+        with routers.scope():
+            write(Post)
+            self.assertTrue(routers.is_pinned())
+        self.assertFalse(routers.is_pinned())
+
+    def test_migrate_uses_migrated_database(self):
+        """во время migrate запросы без using() идут в мигрируемую базу"""
+        with routers.migration('other'):
+            self.assertEqual(Post.objects.all().db, 'other')
+            self.assertEqual(router.db_for_write(Post), 'other')
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_failed_migrate_clears_state(self):
+        """упавший migrate не оставляет поток в режиме миграции"""
+        seen = []
+
+        def handle(*args, **options):
+            seen.append(routers.migrating())
+            raise RuntimeError('сбой миграции')
+
+        with mock.patch.object(migrate.Command, 'handle', handle):
+            with self.assertRaises(RuntimeError):
+                call_command('migrate', database='other', verbosity=0)
+        self.assertEqual(seen, ['other'])
+        self.assertIsNone(routers.migrating())
+
+    def test_no_migrations_on_replica(self):
+        """миграции применяются только к основной базе"""
+        self.assertFalse(router.allow_migrate('replica_1', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+@mock.patch('core.routers.DATABASE_REPLICAS', ['replica_1'])
+class AtomicReadTests(TestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_atomic(self):
+        """внутри транзакции чтения не уходят на реплику"""
+        with transaction.atomic():
+            self.assertEqual(Post.objects.all().db, 'default')
+
+    def test_unsaved_relations_do_not_pin(self):
+        """связи несохранённого поста не считаются записью, сохранение — да"""
+        author = User.objects.create(username='author')
+        self.assertFalse(routers.has_written())
+        post = Post(text='Текст', author=author)
+        self.assertFalse(routers.has_written())
+        post.save()
+        self.assertTrue(routers.has_written())
+
+
+@mock.patch('core.routers.DATABASE_REPLICAS', ['replica_1'])
+class ReplicaStickinessTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.addCleanup(routers.reset)
+
+    def run_middleware(self, view, **cookies):
+        seen = {}
+
+        def get_response(request):
+            view()
+            seen['db'] = Post.objects.all().db
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        response = ReplicaStickinessMiddleware(get_response)(request)
+        return response, seen['db']
+
+    def test_write_sets_cookie(self):
+        """запись ставит cookie, которая держит на основной базе"""
+        response, db = self.run_middleware(
+            lambda: write(Post))
+        self.assertEqual(db, 'default')
+        self.assertIn(REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertFalse(routers.is_pinned())
+
+    def test_read_only_request(self):
+        """запрос без записей читает с реплики и не ставит cookie"""
+        response, db = self.run_middleware(lambda: None)
+        self.assertEqual(db, 'replica_1')
+        self.assertNotIn(REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_cookie_pins_primary(self):
+        """с cookie чтения идут на основную базу"""
+        response, db = self.run_middleware(
+            lambda: None, **{REPLICA_STICKY_COOKIE: '1'})
+        self.assertEqual(db, 'default')
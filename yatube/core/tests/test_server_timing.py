@@ -0,0 +1,68 @@
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+
+METRIC = re.compile(r'(\w+)(?:;dur=([\d.]+))?(?:;desc="([^"]*)")?')
+
+
+def parse(header):
+    metrics = {}
+    for item in header.split(', '):
+        name, dur, desc = METRIC.fullmatch(item).groups()
+        metrics[name] = (float(dur) if dur else None, desc)
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(text='post', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_metrics(self):
+        """ответ содержит SQL, шаблоны, view, кеш и общее время"""
+        response = self.client.get(
+            reverse('posts:post_details', kwargs={'post_id': self.post.pk}))
+        metrics = parse(response['Server-Timing'])
+        self.assertEqual(
+            set(metrics), {'sql', 'tpl', 'ctx', 'view', 'cache', 'total'})
+        self.assertRegex(metrics['sql'][1], r'^[1-9]\d* queries$')
+        self.assertGreater(metrics['tpl'][0], 0)
+        self.assertLessEqual(metrics['view'][0], metrics['total'][0])
+
+    def test_cache_hits_and_misses(self):
+        """закешированная страница считается попаданиями в кеш"""
+        first = parse(self.client.get(reverse('posts:index'))
+                      ['Server-Timing'])
+        second = parse(self.client.get(reverse('posts:index'))
+                       ['Server-Timing'])
+        self.assertRegex(first['cache'][1], r'misses=[1-9]')
+        self.assertEqual(second['sql'][1], '0 queries')
+        self.assertRegex(second['cache'][1], r'^hits=[1-9]\d* misses=0$')
+
+    def test_sampling(self):
+        """без попадания в выборку заголовок не пишется"""
+        with mock.patch(
+                'core.middleware.SERVER_TIMING_SAMPLE_RATE', 0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_only_internal_or_staff(self):
+        """внешний адрес получает заголовок, только если это сотрудник"""
+        path = reverse('posts:index')
+        outside = {'REMOTE_ADDR': '203.0.113.7'}
+        response = self.client.get(path, **outside)
+        self.assertNotIn('Server-Timing', response)
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(path, **outside)
+        self.assertIn('Server-Timing', response)
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from core import slow_queries
+from core.db import retry_busy
+from posts.models import Post, User
+
+
+@mock.patch('core.slow_queries.SLOW_QUERY_THRESHOLD_MS', 0)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        Post.objects.create(text='post', author=cls.author)
+
+    def setUp(self):
+        slow_queries.clear()
+
+    def test_entry(self):
+        """в журнал попадают отпечаток, место вызова и план запроса"""
+        list(Post.objects.filter(text__contains='post', id__in=[1, 2, 3]))
+        entry = slow_queries.entries()[-1]
+        self.assertIn('IN (...)', entry['fingerprint'])
+        self.assertNotIn('%s', entry['fingerprint'])
+        self.assertIn('test_slow_queries.py', entry['call_site'])
+        self.assertTrue(entry['plan'])
+
+    def test_full_scan(self):
+        """полный скан posts_post отмечается отдельно"""
+        list(Post.objects.filter(text__contains='post'))
+        self.assertEqual(slow_queries.entries()[-1]['full_scans'],
+                         ['posts_post'])
+
+    def test_logged_inside_retry(self):
+        """паузы retry_busy не попадают во время запроса"""
+        wrappers = connection.execute_wrappers
+        self.assertLess(wrappers.index(retry_busy),
+                        wrappers.index(slow_queries.log_slow_query))
+
+    def test_fingerprint(self):
+        """литералы заменяются, одинаковые запросы совпадают"""
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT 1 WHERE a = 'x''y' AND b = 10"),
+            slow_queries.fingerprint('SELECT  2 WHERE a = %s AND b = %s'),
+        )
+
+    def test_page_staff_only(self):
+        """страница журнала доступна только персоналу"""
+        url = reverse('slow_queries')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.staff)
+        list(Post.objects.filter(text__contains='post'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Полный скан: posts_post')
+        self.assertTrue(response.context['has_permission'])
+
+    def test_clear(self):
+        """POST очищает журнал"""
+        self.client.force_login(self.staff)
+        self.client.post(reverse('slow_queries'))
+        self.assertEqual(slow_queries.entries(), [])
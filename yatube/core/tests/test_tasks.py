@@ -0,0 +1,199 @@
+import json
+from concurrent.futures import Future
+from unittest import mock
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import User
+from .. import routers, tasks
+from ..mail import QueuedEmailBackend
+from ..models import Task
+
+calls = []
+
+
+@tasks.task(max_attempts=2)
+def flaky(fail):
+    calls.append(fail)
+    if fail:
+        raise ValueError('boom')
+
+
+@tasks.task(batch=True)
+def collect(payloads):
+    calls.append(payloads)
+
+
+@tasks.task()
+def check_pinned():
+    calls.append(routers.is_pinned())
+
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class BrokenSubjectBackend(EmailBackend):
+    """locmem, который не может отправить письмо с темой «broken»."""
+    def send_messages(self, messages):
+        if any(message.subject == 'broken' for message in messages):
+            raise ConnectionError('smtp down')
+        return super().send_messages(messages)
+
+
+class InlineExecutor:
+    """Исполнитель без потоков: в тестовой транзакции потоки не видят
+    данных друг друга."""
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, *args):
+        self.submitted.append(args)
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_until_worker_runs(self):
+        """delay только пишет задачу, выполняет её run_pending"""
+        flaky.delay(fail=False)
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [False])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """упавшая задача откладывается, а после max_attempts — failed"""
+        flaky.delay(fail=True)
+        tasks.run_pending()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertIn('boom', task.last_error)
+        self.assertEqual(tasks.run_pending(), 0)
+        Task.objects.update(run_at=task.created)
+        tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_batch_task_gets_all_payloads(self):
+        """batch-задачи одного вида выполняются одним вызовом"""
+        for number in range(3):
+            collect.delay(number=number)
+        self.assertEqual(tasks.run_pending(), 3)
+        self.assertEqual(
+            calls, [[{'number': 0}, {'number': 1}, {'number': 2}]])
+
+    def test_task_reads_primary(self):
+        """задача читает с основной базы, после неё поток отпускается"""
+        check_pinned.delay()
+        tasks.run_pending()
+        self.assertEqual(calls, [True])
+        self.assertFalse(routers.is_pinned())
+
+    def test_unknown_task_fails(self):
+        """незарегистрированная задача сразу помечается failed"""
+        Task.objects.create(name='nowhere.task', payload='{}')
+        tasks.run_pending()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_stale_running_task_is_requeued(self):
+        """задача брошенного воркера возвращается в очередь"""
+        flaky.delay(fail=False)
+        self.assertEqual(len(tasks.claim()), 1)
+        self.assertEqual(tasks.claim(), [])
+        with mock.patch.object(tasks, 'TASKS_LOCK_TIMEOUT', -1):
+            self.assertEqual(len(tasks.claim()), 1)
+
+    def test_purge_done(self):
+        """выполненные задачи удаляются после срока хранения"""
+        flaky.delay(fail=False)
+        flaky.delay(fail=True)
+        tasks.run_pending()
+        self.assertEqual(tasks.purge_done(), 0)
+        self.assertEqual(tasks.purge_done(keep=-60), 1)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+    def test_run_pending_with_executor(self):
+        """batch-задачи уходят в пул одной пачкой, прочие по одной"""
+        collect.delay(number=1)
+        collect.delay(number=2)
+        flaky.delay(fail=False)
+        flaky.delay(fail=False)
+        executor = InlineExecutor()
+        with mock.patch.object(tasks, 'close_old_connections') as close:
+            self.assertEqual(tasks.run_pending(executor), 4)
+        self.assertEqual([len(items) for name, items in executor.submitted],
+                         [2, 1, 1])
+        self.assertEqual(close.call_count, 3)
+        self.assertEqual(
+            Task.objects.filter(status=Task.DONE).count(), 4)
+
+
+@override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend')
+@mock.patch('core.mail.TASKS_EMAIL_BACKEND', LOCMEM)
+class QueuedEmailTests(TestCase):
+    def test_messages_are_sent_by_worker(self):
+        """письма уходят пачкой только из исполнителя"""
+        message = EmailMultiAlternatives(
+            'subject', 'body', 'from@example.com', ['to@example.com'],
+            headers={'X-Test': '1'})
+        message.attach_alternative('<p>body</p>', 'text/html')
+        self.assertEqual(QueuedEmailBackend().send_messages([message]), 1)
+        mail.send_mail('second', 'body', None, ['to@example.com'])
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertEqual(
+            [sent.subject for sent in mail.outbox], ['subject', 'second'])
+        self.assertEqual(mail.outbox[0].extra_headers, {'X-Test': '1'})
+        self.assertEqual(
+            mail.outbox[0].alternatives, [('<p>body</p>', 'text/html')])
+
+    def test_sent_messages_are_not_resent(self):
+        """повторяется только упавшее письмо пачки"""
+        for subject in ('first', 'broken', 'last'):
+            mail.send_mail(subject, 'body', None, ['to@example.com'])
+        with mock.patch('core.mail.TASKS_EMAIL_BACKEND',
+                        f'{__name__}.BrokenSubjectBackend'):
+            tasks.run_pending()
+        self.assertEqual(
+            [sent.subject for sent in mail.outbox], ['first', 'last'])
+        failed = Task.objects.get(status=Task.QUEUED)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('smtp down', failed.last_error)
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+
+    def test_password_reset_is_queued(self):
+        """письмо сброса пароля не отправляется в запросе"""
+        user = User.objects.create_user(
+            'user', email='user@example.com', password='password')
+        self.client.post(reverse('users:password_reset_form'),
+                         {'email': 'user@example.com'})
+        self.assertEqual(mail.outbox, [])
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertIn(reverse('users:password_reset_confirm', kwargs={
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        }), mail.outbox[0].body)
+
+    def test_password_reset_keeps_no_token(self):
+        """в очереди лежит id пользователя, а не ссылка с токеном"""
+        user = User.objects.create_user(
+            'user', email='user@example.com', password='password')
+        self.client.post(reverse('users:password_reset_form'),
+                         {'email': 'user@example.com'})
+        payload = Task.objects.get().payload
+        self.assertEqual(json.loads(payload)['user_id'], user.pk)
+        self.assertNotIn(default_token_generator.make_token(user), payload)
@@ -0,0 +1,125 @@
+"""Счётчики времени одного запроса для заголовка Server-Timing.
+
+Статистика живёт в thread-local и собирается, только пока middleware
+держит её открытой: вне выбранного запроса обёртки стоят почти ничего.
+Шаблоны и кеш считают бэкенды из core.backends, подключённые в
+TEMPLATES и CACHES, SQL — execute_wrapper на время запроса.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_local = threading.local()
+_MISSING = object()
+
+
+class RequestStats:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.processors_time = 0.0
+        self.view_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_depth = 0
+        self.cache_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    def header(self, total):
+        """Значение Server-Timing; время в миллисекундах."""
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'ctx;dur={self.processors_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'cache;desc="hits={self.cache_hits} '
+            f'misses={self.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def collect():
+    stats = RequestStats()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = None
+
+
+@contextmanager
+def timed_template():
+    """Время рендера шаблона; вложенные шаблоны не считаются дважды."""
+    stats = current_stats()
+    if stats is None or stats.template_depth:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_time += time.perf_counter() - started
+        stats.template_depth -= 1
+
+
+def timed_processor(processor):
+    @wraps(processor)
+    def wrapper(request):
+        stats = current_stats()
+        if stats is None:
+            return processor(request)
+        started = time.perf_counter()
+        try:
+            return processor(request)
+        finally:
+            stats.processors_time += time.perf_counter() - started
+    return wrapper
+
+
+def counted_get(get, key, default=None, version=None):
+    """cache.get с подсчётом попадания или промаха."""
+    stats = current_stats()
+    if stats is None or stats.cache_depth:
+        return get(key, default, version)
+    stats.cache_depth += 1
+    try:
+        value = get(key, _MISSING, version)
+    finally:
+        stats.cache_depth -= 1
+    if value is _MISSING:
+        stats.cache_misses += 1
+        return default
+    stats.cache_hits += 1
+    return value
+
+
+def counted_get_many(get_many, keys, version=None):
+    stats = current_stats()
+    if stats is None or stats.cache_depth:
+        return get_many(keys, version)
+    keys = list(keys)
+    # BaseCache.get_many вызывает get: внутренние вызовы не считаем
+    stats.cache_depth += 1
+    try:
+        found = get_many(keys, version)
+    finally:
+        stats.cache_depth -= 1
+    stats.cache_hits += len(found)
+    stats.cache_misses += len(keys) - len(found)
+    return found
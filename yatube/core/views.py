@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_http_methods
+
+from core import slow_queries as log
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def slow_queries(request):
+    if request.method == 'POST':
+        log.clear()
+        return redirect('slow_queries')
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Медленные запросы',
+        'threshold': log.SLOW_QUERY_THRESHOLD_MS,
+        'groups': log.summary(),
+    }
+    return render(request, 'admin/slow_queries.html', context)
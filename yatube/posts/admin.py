@@ -1,15 +1,136 @@
+import datetime
+
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .archive import archived_count
+from .groups import registry
+from .models import AuthorStats, Post, PostQuerySet, Group
+from .search import fts_available, fts_query, matching_ids
+
+# Больше этого числа строк список постов в админке не пересчитывает
+ADMIN_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator списка постов без COUNT(*) по всей таблице.
+
+    Строки считаются не дальше ADMIN_COUNT_LIMIT. Если без фильтров
+    постов больше, число берётся из счётчиков AuthorStats за вычетом
+    архива: в счётчиках он есть, а в posts_post уже нет. С фильтрами
+    список обрезается до ADMIN_COUNT_LIMIT, дальше сужают по датам.
+    """
+
+    @cached_property
+    def count(self):
+        count = self.object_list.order_by()[:ADMIN_COUNT_LIMIT + 1].count()
+        if count <= ADMIN_COUNT_LIMIT:
+            return count
+        if not self.object_list.query.where:
+            total = AuthorStats.objects.aggregate(
+                total=Sum('posts_count'))['total']
+            return max((total or 0) - archived_count(), count)
+        return ADMIN_COUNT_LIMIT
+
+
+def next_period(day, kind):
+    if kind == 'year':
+        return day.replace(year=day.year + 1)
+    return (day + datetime.timedelta(days=32)).replace(day=1)
+
+
+class DateNavigationQuerySet(PostQuerySet):
+    """Запросы date_hierarchy поиском по индексу pub_date.
 
-from .models import Post, Group
+    Годы и месяцы ищутся прыжками: первый пост не раньше начала
+    следующего периода, по запросу на период вместо DISTINCT по всем
+    строкам. Min и Max считаются отдельно: так SQLite берёт их с краёв
+    индекса.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        if len(kwargs) > 1 and not args and all(
+                isinstance(value, (Min, Max)) for value in kwargs.values()):
+            result = {}
+            for name, value in kwargs.items():
+                result.update(self.aggregate(**{name: value}))
+            return result
+        return super().aggregate(*args, **kwargs)
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month'):
+            return super().dates(field_name, kind, order)
+        values = self.order_by(field_name).values_list(field_name, flat=True)
+        periods = []
+        value = values.first()
+        while value is not None:
+            day = timezone.localtime(value).date()
+            start = day.replace(month=1 if kind == 'year' else day.month,
+                                day=1)
+            periods.append(start)
+            boundary = timezone.make_aware(datetime.datetime.combine(
+                next_period(start, kind), datetime.time.min))
+            value = values.filter(
+                **{f'{field_name}__gte': boundary}).first()
+        return periods if order == 'ASC' else periods[::-1]
+
+
+class GroupAutocompleteSelect(AutocompleteSelect):
+    """Выбранная группа берётся из реестра, а не запросом на строку."""
+
+    def optgroups(self, name, value, attr=None):
+        default = (None, [], 0)
+        selected = {str(pk) for pk in value if pk not in ('', None)}
+        if not self.is_required:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for group in registry.load().groups:
+            if str(group.pk) in selected:
+                default[1].append(self.create_option(
+                    name, group.pk, str(group), True, len(default[1])))
+        return [default]
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateNavigationQuerySet(
+            model=queryset.model, query=queryset.query, using=queryset.db)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not fts_available() or not fts_query(search_term):
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(id__in=matching_ids(search_term)), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,188 @@
+"""JSON API лент только для чтения.
+
+Ленты листаются курсорами ?before= / ?after= из paginators, состав
+полей задаётся ?fields=text,author. Ответы кешируются по тем же
+поколениям, что и html-страницы, и отдают ETag. Профиль, группа и
+пост, как и html-страницы, за горячим окном читают архив.
+
+Выгрузка /api/posts/export/ доступна персоналу и по токену
+POSTS_API_EXPORT_TOKEN в заголовке «Authorization: Bearer <токен>».
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core.decorators import query_budget
+from core.page_cache import page_cache
+from .archive import ArchivePaginator, has_archive
+from .details import get_post_details
+from .groups import get_group_or_404
+from .models import Post, PostHistory, User
+from .paginators import CursorPaginator
+from .scopes import (author_scopes, group_scopes, index_scopes,
+                     post_detail_scopes)
+from .views import POSTS_ON_SCREEN
+
+API_MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 500
+API_EXPORT_TOKEN = getattr(settings, 'POSTS_API_EXPORT_TOKEN', '')
+
+FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: post.author.username,
+    'author_name': lambda post: post.author.get_full_name(),
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'url': lambda post: reverse('posts:post_details', args=[post.pk]),
+}
+
+
+class ApiError(Exception):
+    pass
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ApiError(
+            'Неизвестные поля: {}. Доступны: {}'.format(
+                ', '.join(sorted(unknown)), ', '.join(FIELDS)))
+    return fields
+
+
+def requested_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_ON_SCREEN))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(limit, API_MAX_LIMIT))
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name](post) for name in fields}
+
+
+def error_response(error):
+    return JsonResponse({'error': str(error)}, status=400)
+
+
+def feed_response(request, post_list, archive_list=None):
+    try:
+        fields = requested_fields(request)
+        limit = requested_limit(request)
+    except ApiError as error:
+        return error_response(error)
+    if archive_list is None:
+        paginator = CursorPaginator(post_list, limit)
+    else:
+        paginator = ArchivePaginator(post_list, limit, archive_list)
+    page_obj = paginator.get_cursor_page(
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    ) or paginator.first_page()
+    return JsonResponse({
+        'results': [serialize(post, fields) for post in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    })
+
+
+@query_budget(2)
+@require_GET
+@page_cache(index_scopes, anonymous_only=False)
+def index(request):
+    return feed_response(request, Post.objects.feed())
+
+
+@query_budget(3)
+@require_GET
+@page_cache(group_scopes, anonymous_only=False)
+def group_posts(request, slug):
+    group = get_group_or_404(slug)
+    return feed_response(
+        request, group.posts.feed(),
+        PostHistory.objects.feed().filter(group=group))
+
+
+@query_budget(3)
+@require_GET
+@page_cache(author_scopes, anonymous_only=False)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, author.posts.feed(),
+        PostHistory.objects.feed().filter(author=author))
+
+
+@query_budget(1)
+@require_GET
+@page_cache(post_detail_scopes, anonymous_only=False)
+def post_details(request, post_id):
+    try:
+        fields = requested_fields(request)
+    except ApiError as error:
+        return error_response(error)
+    return JsonResponse(serialize(get_post_details(post_id), fields))
+
+
+def export_posts(post_list, chunk_size):
+    """Посты по id, пачками по ключу: без OFFSET и долгого чтения.
+
+    Каждая пачка — отдельный запрос, поэтому медленный клиент не держит
+    транзакцию чтения открытой до конца выгрузки.
+    """
+    post_list = post_list.order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(post_list.filter(id__gt=last_id)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].pk
+
+
+def can_export(request):
+    if API_EXPORT_TOKEN:
+        scheme, _, token = request.META.get(
+            'HTTP_AUTHORIZATION', '').partition(' ')
+        if (scheme.lower() == 'bearer'
+                and constant_time_compare(token, API_EXPORT_TOKEN)):
+            return True
+    return request.user.is_staff
+
+
+def stream_posts(posts, fields):
+    encoder = DjangoJSONEncoder()
+    yield '['
+    for number, post in enumerate(posts):
+        if number:
+            yield ','
+        yield encoder.encode(serialize(post, fields))
+    yield ']'
+
+
+@query_budget(2)
+@require_GET
+def export(request):
+    """Все посты одним JSON-массивом, который отдаётся по частям."""
+    if not can_export(request):
+        return JsonResponse(
+            {'error': 'Выгрузка доступна персоналу и по токену'},
+            status=403)
+    try:
+        fields = requested_fields(request)
+    except ApiError as error:
+        return error_response(error)
+    model = PostHistory if has_archive() else Post
+    posts = export_posts(model.objects.feed(), EXPORT_CHUNK_SIZE)
+    return StreamingHttpResponse(
+        stream_posts(posts, fields), content_type='application/json')
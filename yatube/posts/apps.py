@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals
+        pre_migrate.connect(signals.drop_post_views, sender=self)
+        post_migrate.connect(signals.restore_post_schema, sender=self)
@@ -0,0 +1,319 @@
+"""Архив старых постов по годам.
+
+manage.py archive_posts пачками переносит посты старше ARCHIVE_AFTER_DAYS
+из posts_post в таблицы posts_post_archive_<год>. Архивные таблицы
+только для чтения: триггеры запрещают INSERT, UPDATE и DELETE, перенос
+и сжатие снимают запрет только внутри своей транзакции. Представление
+posts_post_history (модель PostHistory) объединяет posts_post со всеми
+годами архива.
+
+Все архивные посты старше всех постов в posts_post, поэтому страницы
+профиля и группы, целиком попавшие в горячее окно, читаются из
+posts_post, а дальние — из posts_post_history (ArchivePaginator).
+Перенесённые посты остаются в счётчиках авторов и групп, но пропадают
+из поиска и лент подписок.
+
+SQLite не пересобирает таблицу, на которую смотрит представление,
+поэтому на время migrate оно снимается (drop_history) и потом
+строится заново (restore_history).
+
+Перенос идёт в отдельном процессе, и сброс локального кеша до
+веб-процессов не доходит: список лет они перечитывают раз в
+ARCHIVE_YEARS_TIMEOUT секунд, страницы и числа постов живут не дольше
+PAGE_CACHE_TIMEOUT и POSTS_COUNT_CACHE_TIMEOUT.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from core.page_cache import GLOBAL_SCOPE, bump_page_generations
+from .models import Post, TimelineEntry
+from .paginators import FeedPaginator, invalidate_feed_counts
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'POSTS_ARCHIVE_AFTER_DAYS', 365)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'POSTS_ARCHIVE_BATCH_SIZE', 1000)
+ARCHIVE_PREFIX = 'posts_post_archive_'
+HISTORY_VIEW = 'posts_post_history'
+COLUMNS = 'id, text, pub_date, author_id, group_id'
+GUARDED = ('INSERT', 'UPDATE', 'DELETE')
+ARCHIVE_YEARS_KEY = 'posts:archive:years'
+ARCHIVE_YEARS_TIMEOUT = getattr(settings, 'POSTS_ARCHIVE_YEARS_TIMEOUT', 60)
+
+
+def archive_table(year):
+    return f'{ARCHIVE_PREFIX}{year}'
+
+
+def history_sql(years):
+    selects = [f'SELECT {COLUMNS} FROM posts_post'] + [
+        f'SELECT {COLUMNS} FROM {archive_table(year)}' for year in years]
+    return [
+        f'DROP VIEW IF EXISTS {HISTORY_VIEW}',
+        f'CREATE VIEW {HISTORY_VIEW} AS ' + ' UNION ALL '.join(selects),
+    ]
+
+
+DROP_HISTORY = [f'DROP VIEW IF EXISTS {HISTORY_VIEW}']
+
+
+def create_table_sql(table):
+    return f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id integer NOT NULL PRIMARY KEY,
+            text text NOT NULL,
+            pub_date datetime NOT NULL,
+            author_id integer NOT NULL,
+            group_id integer NULL
+        )
+    '''
+
+
+def index_sql(table):
+    return [
+        f'CREATE INDEX IF NOT EXISTS {table}_author_idx '
+        f'ON {table} (author_id, pub_date DESC, id DESC)',
+        f'CREATE INDEX IF NOT EXISTS {table}_group_idx '
+        f'ON {table} (group_id, pub_date DESC, id DESC)',
+    ]
+
+
+def guard_sql(table, operation):
+    return (
+        f'CREATE TRIGGER IF NOT EXISTS {table}_no_{operation.lower()} '
+        f'BEFORE {operation} ON {table} BEGIN '
+        f"SELECT RAISE(ABORT, 'архив только для чтения'); END"
+    )
+
+
+def unguard_sql(table, operation):
+    return f'DROP TRIGGER IF EXISTS {table}_no_{operation.lower()}'
+
+
+def execute(statements, params=None, using=None):
+    db = connection if using is None else connections[using]
+    with db.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement, params)
+
+
+def archive_cutoff():
+    """Посты старше этой даты могут лежать в архиве."""
+    return timezone.now() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def archive_years(using=None):
+    db = connection if using is None else connections[using]
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name LIKE %s", [f'{ARCHIVE_PREFIX}%'])
+        names = [name[len(ARCHIVE_PREFIX):] for name, in cursor.fetchall()]
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def has_archive():
+    years = cache.get(ARCHIVE_YEARS_KEY)
+    if years is None:
+        years = archive_years()
+        cache.set(ARCHIVE_YEARS_KEY, years, ARCHIVE_YEARS_TIMEOUT)
+    return bool(years)
+
+
+def archived_count():
+    """Сколько постов в архиве, по статистике ANALYZE, где она есть."""
+    rows = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone():
+            cursor.execute(
+                'SELECT tbl, stat FROM sqlite_stat1 WHERE tbl LIKE %s',
+                [f'{ARCHIVE_PREFIX}%'])
+            for table, stat in cursor.fetchall():
+                # Первое число stat — строк в таблице
+                rows[table] = int(stat.split()[0])
+        for year in archive_years():
+            table = archive_table(year)
+            if table not in rows:
+                cursor.execute(f'SELECT COUNT(*) FROM {table}')
+                rows[table], = cursor.fetchone()
+    return sum(rows.values())
+
+
+def drop_history(using):
+    """Снимает представление, чтобы миграции могли пересобрать posts_post."""
+    if connections[using].vendor == 'sqlite':
+        execute(DROP_HISTORY, using=using)
+
+
+def restore_history(using):
+    """Строит представление заново по текущим годам архива."""
+    if connections[using].vendor == 'sqlite':
+        execute(history_sql(archive_years(using)), using=using)
+
+
+def create_archive(year):
+    table = archive_table(year)
+    execute([create_table_sql(table)] + index_sql(table)
+            + [guard_sql(table, operation) for operation in GUARDED])
+
+
+def move_to_archive(year, ids):
+    table = archive_table(year)
+    placeholders = ', '.join(['%s'] * len(ids))
+    execute([unguard_sql(table, 'INSERT')])
+    execute([f'INSERT INTO {table} ({COLUMNS}) SELECT {COLUMNS} '
+             f'FROM posts_post WHERE id IN ({placeholders})'], ids)
+    execute([guard_sql(table, 'INSERT')])
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Переносит в архив до batch_size самых старых постов до cutoff."""
+    rows = list(
+        Post.objects.filter(pub_date__lt=cutoff).order_by('pub_date', 'id')
+        .values_list('id', 'pub_date', 'author_id', 'group_id')[:batch_size])
+    if not rows:
+        return 0
+    by_year = defaultdict(list)
+    for pk, pub_date, _, _ in rows:
+        by_year[pub_date.year].append(pk)
+    ids = [row[0] for row in rows]
+    with transaction.atomic():
+        years = archive_years()
+        new_years = set(by_year) - set(years)
+        for year in sorted(by_year):
+            if year in new_years:
+                create_archive(year)
+            move_to_archive(year, by_year[year])
+        TimelineEntry.objects.filter(post_id__in=ids).delete()
+        # Не через ORM: посты остаются в счётчиках и сигналы не нужны
+        placeholders = ', '.join(['%s'] * len(ids))
+        execute([f'DELETE FROM posts_post WHERE id IN ({placeholders})'],
+                ids)
+        if new_years:
+            execute(history_sql(sorted(set(years) | new_years)))
+    invalidate_feed_counts([
+        Post(pk=pk, author_id=author_id, group_id=group_id)
+        for pk, _, author_id, group_id in rows
+    ])
+    cache.delete(ARCHIVE_YEARS_KEY)
+    return len(rows)
+
+
+def archive_posts(batch_size=ARCHIVE_BATCH_SIZE):
+    """Переносит в архив все посты старше ARCHIVE_AFTER_DAYS, пачками.
+
+    Срок задаётся только настройкой: ArchivePaginator считает, что
+    новее archive_cutoff() архивных постов нет.
+    """
+    cutoff = archive_cutoff()
+    moved = 0
+    while True:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+    if moved:
+        # Статистика для archived_count() и планировщика
+        execute([f'ANALYZE {archive_table(year)}'
+                 for year in archive_years()])
+        bump_page_generations(GLOBAL_SCOPE)
+    return moved
+
+
+def compact_archive(year):
+    """Пересобирает год архива без постов удалённых авторов.
+
+    Возвращает число оставшихся постов. Место в файле освобождает
+    vacuum() после сжатия.
+    """
+    table = archive_table(year)
+    compacted = f'{table}_compact'
+    with transaction.atomic():
+        # Переименование таблицы проверяет схему, представление мешает
+        execute(DROP_HISTORY)
+        execute([
+            create_table_sql(compacted),
+            f'INSERT INTO {compacted} ({COLUMNS}) SELECT {COLUMNS} '
+            f'FROM {table} WHERE author_id IN (SELECT id FROM auth_user)',
+            f'DROP TABLE {table}',
+            f'ALTER TABLE {compacted} RENAME TO {table}',
+        ])
+        execute(index_sql(table)
+                + [guard_sql(table, operation) for operation in GUARDED])
+        execute(history_sql(archive_years()))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            kept, = cursor.fetchone()
+    execute([f'ANALYZE {table}'])
+    return kept
+
+
+def vacuum():
+    """Возвращает файлу базы место после переноса и сжатия."""
+    if not connection.in_atomic_block:
+        execute(['VACUUM'])
+
+
+class ArchivePaginator(FeedPaginator):
+    """FeedPaginator, который за горячим окном читает из архива.
+
+    archive_list — тот же запрос к PostHistory. Страница берётся из
+    posts_post, если она полная или после неё постов нет; иначе, как
+    и для курсоров старше archive_cutoff(), она читается из архива.
+    Страница по курсору читается из архива, если в posts_post за ней
+    ничего нет.
+    """
+
+    def __init__(self, object_list, per_page, archive_list, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.archive_list = archive_list.order_by(*self.ordering)
+
+    def counted_list(self):
+        return self.archive_list
+
+    def from_archive(self, method, *args):
+        hot_list = self.object_list
+        self.object_list = self.archive_list
+        try:
+            return method(*args)
+        finally:
+            self.object_list = hot_list
+
+    def archive_has_more(self, page):
+        if len(page) >= self.per_page:
+            return False
+        if self.has_total:
+            return (page.number - 1) * self.per_page + len(page) < self.count
+        return has_archive()
+
+    def page(self, number):
+        page = super().page(number)
+        if self.archive_has_more(page):
+            page = self.from_archive(super().page, number)
+        return page
+
+    def first_page(self):
+        page = super().first_page()
+        if not page.has_next() and has_archive():
+            page = self.from_archive(super().first_page)
+        return page
+
+    def page_before(self, pub_date, pk):
+        if pub_date < archive_cutoff():
+            return self.from_archive(super().page_before, pub_date, pk)
+        page = super().page_before(pub_date, pk)
+        # Горячее окно кончилось: продолжение, если оно есть, в архиве
+        if not page.has_next() and has_archive():
+            page = self.from_archive(super().page_before, pub_date, pk)
+        return page
+
+    def page_after(self, pub_date, pk):
+        # Архивные посты старше cutoff, новее курсора после него их нет
+        if pub_date < archive_cutoff():
+            return self.from_archive(super().page_after, pub_date, pk)
+        return super().page_after(pub_date, pk)
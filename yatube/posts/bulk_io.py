@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import has_archive
+from .models import Group, Post, PostHistory, User
+from .tasks import fan_out_posts
+
+FIELDS = ('text', 'pub_date', 'author', 'group')
+FORMATS = ('jsonl', 'csv')
+SKIP_AUTHOR = 'неизвестный автор'
+SKIP_GROUP = 'неизвестная группа'
+SKIP_TEXT = 'нет текста'
+SKIP_DATE = 'неверная дата'
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return 'jsonl' if extension in ('json', 'jsonl', 'ndjson') else extension
+
+
+def read_rows(file, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class RowWriter:
+    def __init__(self, file, fmt):
+        self.file = file
+        self.csv = csv.writer(file) if fmt == 'csv' else None
+        if self.csv:
+            self.csv.writerow(FIELDS)
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(dict(zip(FIELDS, row)),
+                                       ensure_ascii=False) + '\n')
+
+
+def parse_pub_date(value):
+    """Дата строки импорта: пустая — сейчас, неразборчивая — None."""
+    if not value:
+        return timezone.now()
+    try:
+        pub_date = parse_datetime(value)
+    except ValueError:
+        # Формат верный, но дата вне диапазона: 2020-02-30 и подобные
+        return None
+    if pub_date is not None and timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date, timezone.utc)
+    return pub_date
+
+
+def skip_reason(row, authors, groups):
+    slug = row.get('group') or None
+    if row.get('author') not in authors:
+        return SKIP_AUTHOR
+    if slug is not None and slug not in groups:
+        return SKIP_GROUP
+    if not row.get('text'):
+        return SKIP_TEXT
+    return None
+
+
+def build_posts(rows):
+    """Посты из строк импорта; авторы и группы ищутся одним запросом.
+
+    Возвращает (посты, Counter пропущенных строк по причинам). Строки
+    с неизвестным автором или группой, без текста или с неразборчивой
+    датой пропускаются.
+    """
+    usernames = {row.get('author') for row in rows}
+    slugs = {row.get('group') for row in rows} - {None, ''}
+    authors = dict(User.objects.filter(username__in=usernames)
+                   .values_list('username', 'id'))
+    groups = dict(Group.objects.filter(slug__in=slugs)
+                  .values_list('slug', 'id'))
+    posts, skipped = [], Counter()
+    for row in rows:
+        reason = skip_reason(row, authors, groups)
+        pub_date = parse_pub_date(row.get('pub_date'))
+        if reason is None and pub_date is None:
+            reason = SKIP_DATE
+        if reason is not None:
+            skipped[reason] += 1
+            continue
+        posts.append(Post(
+            text=row['text'],
+            pub_date=pub_date,
+            author_id=authors[row['author']],
+            group_id=groups.get(row.get('group') or None),
+        ))
+    return posts, skipped
+
+
+def save_posts(posts, batch_size=None):
+    """bulk_create с исходными датами постов и раскладкой по лентам.
+
+    auto_now_add ставит при вставке текущую дату, поэтому исходные даты
+    возвращает bulk_update в той же транзакции; поиск это не трогает,
+    его триггер следит только за text. SQLite не возвращает id
+    вставленных строк, но пока транзакция пишет, чужих вставок нет:
+    новые посты — последние len(posts) id.
+    """
+    if not posts:
+        return
+    pub_dates = [post.pub_date for post in posts]
+    with transaction.atomic():
+        Post.objects.bulk_create(posts, batch_size=batch_size)
+        last_id = Post.objects.aggregate(last=Max('id'))['last']
+        post_ids = range(last_id - len(posts) + 1, last_id + 1)
+        for post, pk, pub_date in zip(posts, post_ids, pub_dates):
+            post.pk, post.pub_date = pk, pub_date
+        Post.objects.bulk_update(posts, ['pub_date'], batch_size=batch_size)
+        fan_out_posts.delay(post_ids=list(post_ids))
+
+
+def export_rows(chunk_size):
+    """Строки выгрузки по id, вместе с архивом, если он есть."""
+    model = PostHistory if has_archive() else Post
+    return (
+        model.objects.order_by('id')
+        .values_list('text', 'pub_date', 'author__username', 'group__slug')
+        .iterator(chunk_size=chunk_size)
+    )
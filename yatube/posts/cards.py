@@ -0,0 +1,114 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import formats
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+
+from core.rendering import render_each
+
+CARD_TEMPLATE = 'includes/post_card.html'
+CARD_CACHE_TIMEOUT = getattr(settings, 'POSTS_CARD_CACHE_TIMEOUT', 60 * 60)
+
+
+def post_version_key(post_id):
+    return f'posts:card_version:post:{post_id}'
+
+
+def author_version_key(author_id):
+    return f'posts:card_version:author:{author_id}'
+
+
+def new_version():
+    return uuid.uuid4().hex[:8]
+
+
+def bump_version(key):
+    cache.set(key, new_version(), None)
+    # Другой процесс мог перечитать карточку до коммита записи
+    transaction.on_commit(lambda: cache.set(key, new_version(), None))
+
+
+def bump_post_card(post_id):
+    bump_version(post_version_key(post_id))
+
+
+def bump_author_cards(author_id):
+    bump_version(author_version_key(author_id))
+
+
+def get_versions(keys):
+    """Версии из кеша; потерянная версия заменяется новой.
+
+    Сбросить версию в ноль нельзя: под старым номером в кеше может
+    лежать устаревшая карточка.
+    """
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def card_key(post, versions):
+    return 'posts:card:{}:{}:{}'.format(
+        post.pk,
+        versions[post_version_key(post.pk)],
+        versions[author_version_key(post.author_id)],
+    )
+
+
+def card_context():
+    """extra_context для render_each: ссылка на автора и дата поста.
+
+    Ссылка считается один раз на автора, дата — один раз на день.
+    """
+    profile_urls = {}
+    dates = {}
+
+    def extra(post):
+        if post.author_id not in profile_urls:
+            profile_urls[post.author_id] = reverse(
+                'posts:profile', args=[post.author])
+        day = template_localtime(post.pub_date).date()
+        if day not in dates:
+            dates[day] = formats.date_format(day, 'd E Y')
+        return {
+            'profile_url': profile_urls[post.author_id],
+            'pub_date': dates[day],
+        }
+    return extra
+
+
+def render_cards(posts):
+    return render_each(CARD_TEMPLATE, posts, 'post', card_context())
+
+
+def attach_cards(page_obj):
+    """Кладёт в post.card готовый html карточки для каждого поста.
+
+    Карточки страницы берутся из кеша одним get_many, промахи
+    рендерятся за один проход render_cards.
+    """
+    posts = list(page_obj)
+    if not posts:
+        return page_obj
+    versions = get_versions(
+        [post_version_key(post.pk) for post in posts]
+        + [author_version_key(post.author_id) for post in posts]
+    )
+    keys = {post.pk: card_key(post, versions) for post in posts}
+    cards = cache.get_many(list(keys.values()))
+    misses = [post for post in posts if keys[post.pk] not in cards]
+    rendered = dict(zip(
+        (keys[post.pk] for post in misses), render_cards(misses)))
+    cards.update(rendered)
+    for post in posts:
+        post.card = mark_safe(cards[keys[post.pk]])
+    if rendered:
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+    return page_obj
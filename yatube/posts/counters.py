@@ -0,0 +1,68 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Group, PostHistory
+
+
+def changed_count(delta):
+    """Новое значение счётчика; уменьшение не уходит ниже нуля."""
+    if delta < 0:
+        return Greatest(F('posts_count') + delta, 0)
+    return F('posts_count') + delta
+
+
+def change_author_count(author_id, delta):
+    updated = AuthorStats.objects.filter(user_id=author_id).update(
+        posts_count=changed_count(delta))
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=author_id, posts_count=delta)
+    except IntegrityError:
+        AuthorStats.objects.filter(user_id=author_id).update(
+            posts_count=F('posts_count') + delta)
+
+
+def change_group_count(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=changed_count(delta))
+
+
+def count_bulk_created(posts):
+    """bulk_create не шлёт post_save, поэтому считаем пачкой."""
+    for author_id, total in Counter(p.author_id for p in posts).items():
+        change_author_count(author_id, total)
+    for group_id, total in Counter(p.group_id for p in posts).items():
+        change_group_count(group_id, total)
+
+
+def author_posts_count(author):
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def rebuild_counters():
+    """Пересчитывает счётчики постов авторов и групп с нуля, с архивом."""
+    with transaction.atomic():
+        by_author = (PostHistory.objects.order_by().values('author')
+                     .annotate(total=Count('id')))
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create(
+            AuthorStats(user_id=row['author'], posts_count=row['total'])
+            for row in by_author
+        )
+        by_group = dict(
+            PostHistory.objects.filter(group__isnull=False).order_by()
+            .values_list('group').annotate(total=Count('id'))
+        )
+        Group.objects.exclude(pk__in=by_group).update(posts_count=0)
+        for group_id, total in by_group.items():
+            Group.objects.filter(pk=group_id).update(posts_count=total)
+    return len(by_author), len(by_group)
@@ -0,0 +1,112 @@
+"""Кеш страницы поста.
+
+Пост лежит в кеше по detail_key, имя автора и число его постов — по
+author_key, одна запись на автора; группа берётся из реестра групп.
+Новый, изменённый или удалённый пост и смена имени сбрасывают одну
+запись автора, сколько бы у него ни было постов. Сброс повторяется
+после коммита: другой процесс мог перечитать запись до него.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .archive import has_archive
+from .counters import author_posts_count
+from .groups import registry
+from .models import AuthorStats, Post, PostHistory, User
+
+DETAIL_CACHE_TIMEOUT = getattr(
+    settings, 'POSTS_DETAIL_CACHE_TIMEOUT', 60 * 60)
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def detail_key(post_id):
+    return f'posts:detail:{post_id}'
+
+
+def author_key(author_id):
+    return f'posts:detail:author:{author_id}'
+
+
+def build_record(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'group_id': post.group_id,
+        'author_id': post.author_id,
+    }
+
+
+def build_author_record(author):
+    record = {field: getattr(author, field) for field in AUTHOR_FIELDS}
+    record['posts_count'] = author_posts_count(author)
+    return record
+
+
+def load_author(author_id, record):
+    author = User(pk=author_id, **{
+        field: record[field] for field in AUTHOR_FIELDS})
+    author.post_stats = AuthorStats(posts_count=record['posts_count'])
+    return author
+
+
+def load_record(record, author):
+    """Пост со связанными объектами из записей, без запросов к базе."""
+    post = Post(pk=record['id'], text=record['text'],
+                pub_date=record['pub_date'], author=author)
+    group = registry.get_by_id(record['group_id'])
+    if group is not None:
+        post.group = group
+    return post
+
+
+def load_post(post_id):
+    post = Post.objects.feed().select_related(
+        'author__post_stats').filter(pk=post_id).first()
+    if post is None and has_archive():
+        post = PostHistory.objects.feed().select_related(
+            'author__post_stats').filter(pk=post_id).first()
+    if post is None:
+        raise Http404('Пост не найден')
+    return post
+
+
+def get_post_details(post_id):
+    record = cache.get(detail_key(post_id))
+    if record is None:
+        post = load_post(post_id)
+        cache.set_many({
+            detail_key(post_id): build_record(post),
+            author_key(post.author_id): build_author_record(post.author),
+        }, DETAIL_CACHE_TIMEOUT)
+        return post
+    author_id = record['author_id']
+    author_record = cache.get(author_key(author_id))
+    if author_record is None:
+        author = User.objects.select_related('post_stats').only(
+            *AUTHOR_FIELDS, 'post_stats__posts_count').filter(
+            pk=author_id).first()
+        if author is None:
+            # Архивный пост удалённого автора: запись поста устарела
+            cache.delete(detail_key(post_id))
+            raise Http404('Пост не найден')
+        author_record = build_author_record(author)
+        cache.set(author_key(author_id), author_record, DETAIL_CACHE_TIMEOUT)
+    return load_record(record, load_author(author_id, author_record))
+
+
+def delete_keys(keys):
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_posts(post_ids):
+    delete_keys([detail_key(post_id) for post_id in post_ids])
+
+
+def invalidate_authors(author_ids):
+    author_ids = set(author_ids) - {None}
+    if author_ids:
+        delete_keys([author_key(author_id) for author_id in author_ids])
@@ -0,0 +1,103 @@
+"""RSS и Atom для ленты, сообществ и авторов.
+
+Лента рендерится один раз на поколение своих областей страничного
+кеша, дальше опрос отвечает из кеша или 304 без запросов к базе:
+по ETag или по Last-Modified — времени смены поколения.
+"""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core.decorators import query_budget
+from core.page_cache import page_cache
+from .groups import get_group_or_404
+from .models import Post, User
+from .scopes import author_scopes, group_scopes, index_scopes
+
+FEED_SIZE = 20
+TITLE_WORDS = 8
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self, obj=None):
+        return Post.objects.feed()[:FEED_SIZE]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_details', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse('posts:profile', args=[item.author.username])
+
+
+class GroupFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_group_or_404(slug)
+
+    def title(self, obj):
+        return f'Yatube: сообщество «{obj.title}»'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def items(self, obj):
+        return obj.posts.feed()[:FEED_SIZE]
+
+
+class AuthorFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи автора {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def items(self, obj):
+        return obj.posts.feed()[:FEED_SIZE]
+
+
+def atom(feed_class):
+    return type(f'Atom{feed_class.__name__}', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,
+    })
+
+
+def cached_feed(feed, get_scopes, budget):
+    return query_budget(budget)(
+        page_cache(get_scopes, anonymous_only=False, last_modified=True)(feed))
+
+
+index_rss = cached_feed(LatestPostsFeed(), index_scopes, 1)
+index_atom = cached_feed(atom(LatestPostsFeed)(), index_scopes, 1)
+group_rss = cached_feed(GroupFeed(), group_scopes, 2)
+group_atom = cached_feed(atom(GroupFeed)(), group_scopes, 2)
+author_rss = cached_feed(AuthorFeed(), author_scopes, 2)
+author_atom = cached_feed(atom(AuthorFeed)(), author_scopes, 2)
@@ -1,5 +1,6 @@
 from django import forms
 
+from .groups import registry
 from .models import Post
 
 
@@ -7,3 +8,8 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Варианты из реестра: рендер формы не читает posts_group
+        self.fields['group'].choices = registry.choices()
@@ -0,0 +1,89 @@
+"""Реестр сообществ в памяти процесса.
+
+Сообщества меняются редко, а читаются на каждой странице группы и
+в каждой форме поста. Реестр держит все группы в памяти и сверяет
+свою версию с ключом в общем кеше: запись или удаление группы меняют
+ключ, и каждый процесс перечитывает группы одним
+запросом при следующем обращении.
+
+Счётчик posts_count в реестре не обновляется при новых постах,
+число постов группы берётся из paginators.feed_count_key.
+"""
+import copy
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+
+from .models import Group
+
+GROUPS_VERSION_KEY = 'posts:groups:version'
+EMPTY_CHOICE = ('', '---------')
+
+
+def current_version():
+    version = cache.get(GROUPS_VERSION_KEY)
+    if version is None:
+        cache.add(GROUPS_VERSION_KEY, uuid.uuid4().hex[:8], None)
+        version = cache.get(GROUPS_VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache.set(GROUPS_VERSION_KEY, uuid.uuid4().hex[:8], None)
+
+
+class GroupRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.groups = []
+        self.by_slug = {}
+        self.by_id = {}
+
+    def load(self):
+        version = current_version()
+        with self.lock:
+            if version != self.version:
+                # С основной базы: реплика может отставать от новой версии
+                self.groups = list(
+                    Group.objects.using(DEFAULT_DB_ALIAS).order_by('pk'))
+                self.by_slug = {group.slug: group for group in self.groups}
+                self.by_id = {group.pk: group for group in self.groups}
+                self.version = version
+            return self
+
+    def get(self, slug):
+        """Копия группы по slug или None: объекты реестра общие."""
+        group = self.load().by_slug.get(slug)
+        return copy.copy(group) if group is not None else None
+
+    def get_by_id(self, group_id):
+        group = self.load().by_id.get(group_id)
+        return copy.copy(group) if group is not None else None
+
+    def slugs(self, group_ids):
+        by_id = self.load().by_id
+        return [by_id[pk].slug for pk in group_ids if pk in by_id]
+
+    def choices(self):
+        return [EMPTY_CHOICE] + [
+            (group.pk, str(group)) for group in self.load().groups]
+
+
+registry = GroupRegistry()
+
+
+def get_group_or_404(slug):
+    group = registry.get(slug)
+    if group is None:
+        raise Http404('Сообщество не найдено')
+    return group
+
+
+def invalidate():
+    bump_version()
+    # Другой процесс мог перечитать группы до коммита записи
+    transaction.on_commit(bump_version)
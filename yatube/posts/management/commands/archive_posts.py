@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import routers
+from posts.archive import (ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE,
+                           archive_posts, archive_years, compact_archive,
+                           vacuum)
+
+
+class Command(BaseCommand):
+    help = (f'Переносит посты старше {ARCHIVE_AFTER_DAYS} дней '
+            f'в архивные таблицы по годам')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--compact', action='store_true',
+                            help='пересобрать архив и сжать файл базы')
+
+    @routers.scope(pinned=True)
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Архив постов есть только в SQLite')
+        moved = archive_posts(batch_size=options['batch_size'])
+        self.stdout.write(f'Перенесено в архив: {moved}')
+        if options['compact']:
+            for year in archive_years():
+                kept = compact_archive(year)
+                self.stdout.write(f'{year}: {kept} постов')
+            vacuum()
+        self.stdout.write(self.style.SUCCESS('Готово'))
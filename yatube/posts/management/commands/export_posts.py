@@ -0,0 +1,42 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import routers
+from posts.bulk_io import FORMATS, RowWriter, export_rows, guess_format
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в JSONL или CSV потоком, не держа их в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл или - для stdout')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    @routers.scope()
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'jsonl' if path == '-' else guess_format(path))
+        if fmt not in FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {fmt}')
+        started = time.monotonic()
+        file = (sys.stdout if path == '-'
+                else open(path, 'w', encoding='utf-8', newline=''))
+        exported = 0
+        try:
+            writer = RowWriter(file, fmt)
+            for text, pub_date, author, group in export_rows(
+                    options['chunk_size']):
+                writer.write(
+                    (text, pub_date.isoformat(), author, group or ''))
+                exported += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено постов: {exported}, '
+            f'{exported / elapsed if elapsed else exported:.0f} строк/с'))
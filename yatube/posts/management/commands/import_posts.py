@@ -0,0 +1,39 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import routers
+from posts.bulk_io import (FORMATS, batches, build_posts, guess_format,
+                           read_rows, save_posts)
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты из JSONL или CSV пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @routers.scope(pinned=True)
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        if fmt not in FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {fmt}')
+        started = time.monotonic()
+        created, skipped = 0, Counter()
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            rows = read_rows(file, fmt)
+            for batch in batches(rows, options['batch_size']):
+                posts, batch_skipped = build_posts(batch)
+                save_posts(posts, batch_size=options['batch_size'])
+                created += len(posts)
+                skipped.update(batch_skipped)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {created}, '
+            f'пропущено строк: {sum(skipped.values())}, '
+            f'{created / elapsed if elapsed else created:.0f} строк/с'))
+        for reason, count in skipped.most_common():
+            self.stdout.write(f'  {reason}: {count}')
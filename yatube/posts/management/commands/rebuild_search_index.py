@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import routers
+from posts.search import CREATE_FTS, fts_available
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс постов и его триггеры'
+
+    @routers.scope(pinned=True)
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in CREATE_FTS:
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS('Индекс поиска перестроен'))
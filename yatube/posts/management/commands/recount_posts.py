@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import routers
+from posts.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп'
+
+    @routers.scope(pinned=True)
+    def handle(self, *args, **options):
+        authors, groups = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано авторов: {authors}, групп с постами: {groups}'))
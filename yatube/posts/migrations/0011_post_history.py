@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+# Представление пересоздаёт post_migrate (posts.signals.restore_post_schema)
+# с учётом лет архива, а pre_migrate снимает: при нём SQLite не даёт
+# пересобрать posts_post в следующих миграциях
+DROP_HISTORY = 'DROP VIEW IF EXISTS posts_post_history'
+
+
+def drop_history(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_HISTORY)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Пост с архивом',
+                'verbose_name_plural': 'Посты с архивом',
+                'db_table': 'posts_post_history',
+                'ordering': ['-pub_date', '-id'],
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_history),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def repair_counters(apps, schema_editor):
+    """Досчитывает счётчики, которые 0008 не заполнила.
+
+    0008 читала и писала через базу по умолчанию, поэтому на остальных
+    базах счётчики могли остаться пустыми. Заполняются только
+    недостающие: в существующих учтены и посты, ушедшие в архив.
+    """
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    db_alias = schema_editor.connection.alias
+    posts = Post.objects.using(db_alias).order_by()
+    counted = AuthorStats.objects.using(db_alias).values('user')
+    by_author = (posts.exclude(author__in=counted).values('author')
+                 .annotate(total=Count('id')))
+    AuthorStats.objects.using(db_alias).bulk_create(
+        AuthorStats(user_id=row['author'], posts_count=row['total'])
+        for row in by_author
+    )
+    empty = Group.objects.using(db_alias).filter(posts_count=0)
+    by_group = (posts.filter(group__in=empty).values('group')
+                .annotate(total=Count('id')))
+    for row in by_group:
+        Group.objects.using(db_alias).filter(pk=row['group']).update(
+            posts_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_counters, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,24 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
+from django.dispatch import Signal
 
 User = get_user_model()
 CHARS_IN_STR = 15
+# bulk_create не отправляет post_save, поэтому шлём свой сигнал
+posts_bulk_created = Signal(providing_args=['posts'])
+FEED_FIELDS = (
+    'id', 'text', 'pub_date',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__slug', 'group__title',
+)
 
 
 class Group(models.Model):
     title = models.CharField('Название', max_length=200)
     slug = models.SlugField('Адрес', unique=True)
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Число постов', default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -18,6 +28,18 @@ class Group(models.Model):
         verbose_name_plural = 'Сообщества'
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для карточек ленты: автор и группа одним запросом."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            posts_bulk_created.send(sender=self.model, posts=objs)
+        return objs
+
+
 class Post(models.Model):
     text = models.TextField('Текст', help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата', auto_now_add=True)
@@ -37,10 +59,158 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост'
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:CHARS_IN_STR]
 
+    def save(self, *args, **kwargs):
+        # Счётчики меняет post_save: пост и счётчики пишутся вместе
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_feed_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_feed_idx'),
+        ]
+
+
+class PostHistory(models.Model):
+    """Все посты: posts_post и архивные таблицы по годам.
+
+    Представление posts_post_history пересоздаёт posts.archive при
+    появлении нового года в архиве. Только для чтения.
+    """
+    text = models.TextField('Текст')
+    pub_date = models.DateTimeField('Дата')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Сообщество'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    def __str__(self):
+        return self.text[:CHARS_IN_STR]
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_history'
+        verbose_name = 'Пост с архивом'
+        verbose_name_plural = 'Посты с архивом'
+        ordering = ['-pub_date', '-id']
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follows',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Сообщество'
+    )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id or self.group_id}'
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_author_follow'),
+            models.UniqueConstraint(fields=['user', 'group'],
+                                    name='unique_group_follow'),
+            models.CheckConstraint(
+                check=(
+                    models.Q(author__isnull=False, group__isnull=True)
+                    | models.Q(author__isnull=True, group__isnull=False)
+                ),
+                name='follow_author_or_group'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата поста')
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_feed_idx'),
+        ]
@@ -0,0 +1,135 @@
+"""Уведомления о новых постах для открытых лент.
+
+Хаб живёт в процессе: post_save после коммита кладёт id поста в
+области index, author:<id> и group:<id> и будит ждущих клиентов.
+Клиент ждёт на Condition и ничего не спрашивает у базы. Посты,
+созданные в других процессах, хаб подбирает сам: не чаще раза
+в HUB_REFRESH_SECONDS на область делается индексный запрос
+«посты новее последнего известного id», общий для всех клиентов.
+Запрос идёт без блокировки хаба, под ней только слияние результата.
+Хаб помнит не больше HUB_MAX_SCOPES областей, давно не нужные
+вытесняются.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+from .models import Post
+
+INDEX_SCOPE = 'index'
+# Сколько последних id хранится на область: больше клиент увидит как «N+»
+HUB_RECENT_POSTS = 100
+HUB_REFRESH_SECONDS = getattr(settings, 'POSTS_HUB_REFRESH_SECONDS', 5)
+HUB_MAX_SCOPES = getattr(settings, 'POSTS_HUB_MAX_SCOPES', 1000)
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def scopes_for(post):
+    scopes = [INDEX_SCOPE, author_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def scope_filter(scope):
+    if scope == INDEX_SCOPE:
+        return {}
+    kind, pk = scope.split(':')
+    return {f'{kind}_id': int(pk)}
+
+
+class PostHub:
+    def __init__(self, recent=HUB_RECENT_POSTS,
+                 refresh_seconds=HUB_REFRESH_SECONDS,
+                 max_scopes=HUB_MAX_SCOPES):
+        self.recent = recent
+        self.refresh_seconds = refresh_seconds
+        self.max_scopes = max_scopes
+        self.condition = threading.Condition()
+        self.posts = OrderedDict()
+        self.refreshed = {}
+
+    def publish(self, post):
+        with self.condition:
+            for scope in scopes_for(post):
+                if scope in self.posts:
+                    self.add(scope, [post.pk])
+            self.condition.notify_all()
+
+    def add(self, scope, ids):
+        known = self.posts[scope]
+        newest = known[-1] if known else 0
+        known.extend(sorted(pk for pk in ids if pk > newest))
+
+    def track(self, scope):
+        """Известные id области; вытесняет самую давно нужную область."""
+        known = self.posts.get(scope)
+        if known is None:
+            known = self.posts[scope] = deque(maxlen=self.recent)
+            while len(self.posts) > self.max_scopes:
+                evicted, _ = self.posts.popitem(last=False)
+                self.refreshed.pop(evicted, None)
+        else:
+            self.posts.move_to_end(scope)
+        return known
+
+    def refresh(self, scope):
+        """Догружает из базы посты новее известных, не чаще refresh_seconds.
+
+        Вызывается без self.condition: запрос к базе не держит хаб.
+        """
+        with self.condition:
+            now = time.monotonic()
+            if now - self.refreshed.get(scope, -self.refresh_seconds) < (
+                    self.refresh_seconds):
+                return
+            self.refreshed[scope] = now
+            known = self.track(scope)
+            newest = known[-1] if known else None
+        posts = Post.objects.filter(**scope_filter(scope))
+        if newest is not None:
+            posts = posts.filter(id__gt=newest)
+        ids = list(posts.order_by('-id').values_list('id', flat=True)
+                   [:self.recent])
+        if ids:
+            with self.condition:
+                self.track(scope)
+                self.add(scope, ids)
+                self.condition.notify_all()
+
+    def latest(self, scope):
+        self.refresh(scope)
+        with self.condition:
+            known = self.track(scope)
+            return known[-1] if known else 0
+
+    def newer(self, scope, since):
+        """(число постов новее since, последний id); число не больше recent."""
+        with self.condition:
+            known = self.posts.get(scope, ())
+            count = sum(1 for pk in known if pk > since)
+            return count, (known[-1] if known else since)
+
+    def wait(self, scope, since, timeout):
+        """Ждёт постов новее since до timeout секунд."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.refresh(scope)
+            with self.condition:
+                count, latest = self.newer(scope, since)
+                remaining = deadline - time.monotonic()
+                if count or remaining <= 0:
+                    return count, latest
+                self.condition.wait(min(remaining, self.refresh_seconds))
+
+
+hub = PostHub()
@@ -0,0 +1,290 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_ORDERING = ('-pub_date', '-id')
+COUNT_CACHE_TIMEOUT = getattr(settings, 'POSTS_COUNT_CACHE_TIMEOUT', 60 * 5)
+# Больше этого числа строк ленту не считаем: работаем без общего числа
+COUNT_LIMIT = getattr(settings, 'POSTS_COUNT_LIMIT', 10000)
+PAGE_WINDOW = getattr(settings, 'POSTS_PAGE_WINDOW', 2)
+NO_TOTAL = -1
+
+
+def feed_count_key(scope, pk=None):
+    if pk is None:
+        return f'posts:feed_count:{scope}'
+    return f'posts:feed_count:{scope}:{pk}'
+
+
+def invalidate_feed_counts(posts):
+    keys = {feed_count_key('index')}
+    for post in posts:
+        previous = getattr(post, '_counted', {})
+        for author_id in {post.author_id, previous.get('author_id')}:
+            if author_id is not None:
+                keys.add(feed_count_key('author', author_id))
+        for group_id in {post.group_id, previous.get('group_id')}:
+            if group_id is not None:
+                keys.add(feed_count_key('group', group_id))
+    keys = list(keys)
+    cache.delete_many(keys)
+    # Другой процесс мог пересчитать ленту до коммита записи
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def encode_cursor(post):
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id) из токена или None, если токен битый."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def older_than(pub_date, pk, id_field='id'):
+    return (Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, **{f'{id_field}__lt': pk}))
+
+
+def newer_than(pub_date, pk, id_field='id'):
+    return (Q(pub_date__gt=pub_date)
+            | Q(pub_date=pub_date, **{f'{id_field}__gt': pk}))
+
+
+class CursorPage(Page):
+    """Страница ленты, которая умеет ссылаться на соседей курсорами.
+
+    Страницы по номеру работают как обычно, а ссылки «вперёд/назад»
+    строятся по ключу (pub_date, id), поэтому переход к следующей
+    странице не зависит от её глубины.
+    """
+
+    is_cursor = False
+
+    @property
+    def page_window(self):
+        """Номера страниц вокруг текущей, не больше 2 * PAGE_WINDOW + 1."""
+        return self.paginator.get_page_window(self.number)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(self[len(self) - 1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(self[0])
+
+
+class KeysetPage(CursorPage):
+    """Страница, выбранная курсором: без OFFSET и без COUNT(*)."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return None
+
+    def previous_page_number(self):
+        return None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Paginator с дополнительным режимом keyset-пагинации.
+
+    Сортирует queryset по ordering: дата и поле id_field, по которым
+    строятся курсоры. Если число объектов уже известно (например, из
+    счётчика), его можно передать в count, и COUNT(*) выполняться не
+    будет.
+    """
+
+    ordering = CURSOR_ORDERING
+    id_field = 'id'
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def fetch(self, rows):
+        """Объекты страницы из строк object_list."""
+        return list(rows)
+
+    def _get_page(self, object_list, *args, **kwargs):
+        return CursorPage(self.fetch(object_list), *args, **kwargs)
+
+    def first_page(self):
+        """Первая страница без COUNT(*) и OFFSET."""
+        rows = list(self.object_list[:self.per_page + 1])
+        return KeysetPage(self.fetch(rows[:self.per_page]), self,
+                          len(rows) > self.per_page, False)
+
+    def page_before(self, pub_date, pk):
+        """Посты старше курсора: следующая страница ленты."""
+        rows = list(self.object_list.filter(
+            older_than(pub_date, pk, self.id_field))[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        has_previous = self.object_list.filter(
+            newer_than(pub_date, pk, self.id_field)).exists()
+        return KeysetPage(
+            self.fetch(rows[:self.per_page]), self, has_next, has_previous)
+
+    def page_after(self, pub_date, pk):
+        """Посты новее курсора: предыдущая страница ленты."""
+        rows = list(
+            self.object_list.filter(newer_than(pub_date, pk, self.id_field))
+            .reverse()[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        has_next = self.object_list.filter(
+            older_than(pub_date, pk, self.id_field)).exists()
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return KeysetPage(self.fetch(rows), self, has_next, has_previous)
+
+    def get_cursor_page(self, before=None, after=None):
+        """Страница по токену ?before= / ?after= или None."""
+        if before:
+            cursor = decode_cursor(before)
+            if cursor is not None:
+                return self.page_before(*cursor)
+        if after:
+            cursor = decode_cursor(after)
+            if cursor is not None:
+                return self.page_after(*cursor)
+        return None
+
+
+class FeedPaginator(CursorPaginator):
+    """Paginator ленты, который не считает строки на каждый запрос.
+
+    Число постов кешируется по count_key на COUNT_CACHE_TIMEOUT секунд
+    и сбрасывается сигналами при сохранении постов. Считается не больше
+    COUNT_LIMIT строк: если их больше, paginator переходит в режим
+    без общего числа, где знает только, есть ли следующая страница.
+    """
+
+    has_total = True
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        self.count_key = count_key
+        super().__init__(object_list, per_page, **kwargs)
+
+    def counted_list(self):
+        return self.object_list
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_key) if self.count_key else None
+        if count is None:
+            count = self.counted_list().order_by()[:COUNT_LIMIT + 1].count()
+            if count > COUNT_LIMIT:
+                count = NO_TOTAL
+            if self.count_key:
+                cache.set(self.count_key, count, COUNT_CACHE_TIMEOUT)
+        if count == NO_TOTAL:
+            self.has_total = False
+            return 0
+        return count
+
+    def validate_number(self, number):
+        self.count  # выставляет has_total
+        if self.has_total:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def from_end(self, number):
+        """Страница ближе к концу ленты, чем к началу."""
+        if self.counted_list() is not self.object_list:
+            return False
+        bottom = (number - 1) * self.per_page
+        return bottom > self.count - bottom - self.per_page
+
+    def page_from_end(self, number):
+        """Страница по номеру, OFFSET которой отсчитан с конца ленты.
+
+        Дальние страницы и «Последняя» читаются в обратном порядке по
+        тому же индексу, поэтому OFFSET не больше половины ленты.
+        """
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        rows = list(self.object_list.reverse()[
+            self.count - top:self.count - bottom])
+        rows.reverse()
+        return self._get_page(rows, number, self)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.has_total:
+            if self.from_end(number):
+                return self.page_from_end(number)
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        # Нижняя граница числа постов: хватает для has_next и ссылок
+        self.count = bottom + len(rows)
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Без общего числа последняя страница неизвестна
+            return self.page(1)
+
+    def get_page_window(self, number):
+        first = max(1, number - PAGE_WINDOW)
+        last = min(self.num_pages, number + PAGE_WINDOW)
+        return range(first, last + 1)
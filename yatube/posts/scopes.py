@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .groups import registry
+from .models import Post, User
+
+INDEX_SCOPE = 'index'
+USERNAME_CACHE_TIMEOUT = getattr(
+    settings, 'POSTS_USERNAME_CACHE_TIMEOUT', 60 * 60)
+
+
+def index_scopes():
+    return [INDEX_SCOPE]
+
+
+def group_scopes(slug):
+    return [f'group:{slug}']
+
+
+def author_scopes(username):
+    return [f'author:{username}']
+
+
+def post_detail_scopes(post_id):
+    return [f'post:{post_id}']
+
+
+def username_key(user_id):
+    return f'posts:username:{user_id}'
+
+
+def author_username(post):
+    """Имя автора поста без загрузки автора.
+
+    Каскадное удаление пользователя шлёт post_delete для каждого его
+    поста, поэтому имя берётся из кеша: один запрос на автора.
+    """
+    if Post.author.is_cached(post):
+        return post.author.username
+    key = username_key(post.author_id)
+    username = cache.get(key)
+    if username is None:
+        username = User.objects.filter(pk=post.author_id).values_list(
+            'username', flat=True).first()
+        if username is not None:
+            cache.set(key, username, USERNAME_CACHE_TIMEOUT)
+    return username
+
+
+def post_scopes(post, group_ids):
+    """Области страничного кеша, на которые влияет пост."""
+    scopes = index_scopes() + post_detail_scopes(post.pk)
+    username = author_username(post)
+    if username is not None:
+        scopes += author_scopes(username)
+    group_ids = set(group_ids) - {None}
+    if Post.group.is_cached(post) and post.group is not None:
+        scopes += group_scopes(post.group.slug)
+        group_ids.discard(post.group_id)
+    for slug in registry.slugs(group_ids):
+        scopes += group_scopes(slug)
+    return scopes
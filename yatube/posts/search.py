@@ -0,0 +1,211 @@
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+SNIPPET_TOKENS = 16
+# Служебные символы вместо тегов: текст поста экранируется после snippet()
+MARK_START, MARK_END = '\x02', '\x03'
+# Столько лучших результатов запоминается для листания курсором
+SEARCH_RESULTS_LIMIT = getattr(settings, 'POSTS_SEARCH_RESULTS_LIMIT', 1000)
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'POSTS_SEARCH_CACHE_TIMEOUT', 60 * 30)
+
+RANK_SQL = f'''
+    SELECT rowid FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH %s
+    ORDER BY rank, rowid
+    LIMIT %s
+'''
+SNIPPET_SQL = f'''
+    SELECT rowid,
+           snippet({FTS_TABLE}, 0, %s, %s, '…', {SNIPPET_TOKENS})
+    FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH %s AND rowid IN ({{ids}})
+'''
+
+# Django пересоздаёт таблицу posts_post при части изменений схемы на
+# SQLite, и триггеры при этом пропадают: после migrate их возвращает
+# restore_search_index.
+TRIGGERS = (f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au')
+CREATE_FTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def restore_search_index(using=DEFAULT_DB_ALIAS):
+    """Возвращает триггеры индекса, если их сняла пересборка posts_post.
+
+    Индекс при этом перестраивается целиком. Возвращает True, если
+    триггеров не было.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, *TRIGGERS])
+        names = {name for name, in cursor.fetchall()}
+        if FTS_TABLE not in names or names.issuperset(TRIGGERS):
+            return False
+        for statement in CREATE_FTS:
+            cursor.execute(statement)
+    return True
+
+
+def fts_query(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 из запроса
+    не выполняются; слова объединяются через AND.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def results_key(snapshot):
+    return f'posts:search:{snapshot}'
+
+
+def encode_search_cursor(snapshot, offset):
+    return f'{snapshot}_{offset}'
+
+
+def decode_search_cursor(token):
+    try:
+        snapshot, offset = token.split('_')
+        return snapshot, int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+
+def ranked_ids(match, snapshot=None):
+    """id найденных постов от лучших к худшим и ключ их снимка.
+
+    bm25 зависит от всего корпуса и меняется с каждым новым постом,
+    поэтому порядок запоминается при первом запросе, а следующие
+    страницы берутся из снимка и не повторяют и не теряют посты.
+    """
+    ids = cache.get(results_key(snapshot)) if snapshot else None
+    if ids is None:
+        with connection.cursor() as db:
+            db.execute(RANK_SQL, [match, SEARCH_RESULTS_LIMIT])
+            ids = [pk for pk, in db.fetchall()]
+        snapshot = uuid.uuid4().hex[:8]
+        cache.set(results_key(snapshot), ids, SEARCH_CACHE_TIMEOUT)
+    return ids, snapshot
+
+
+def snippets(match, ids):
+    if not ids:
+        return {}
+    sql = SNIPPET_SQL.format(ids=', '.join(['%s'] * len(ids)))
+    with connection.cursor() as db:
+        db.execute(sql, [MARK_START, MARK_END, match, *ids])
+        return dict(db.fetchall())
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPage:
+    def __init__(self, posts, next_cursor):
+        self.object_list = posts
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search_posts(query, per_page, after=None):
+    """Страница найденных постов, от самых релевантных.
+
+    У постов есть snippet с подсветкой. Следующая страница выбирается
+    курсором по снимку результатов (см. ranked_ids), снимок хранит не
+    больше SEARCH_RESULTS_LIMIT постов.
+    """
+    match = fts_query(query)
+    if not match:
+        return SearchPage([], None)
+    if not fts_available():
+        posts = list(Post.objects.feed().filter(
+            text__icontains=query)[:per_page])
+        for post in posts:
+            post.snippet = post.text
+        return SearchPage(posts, None)
+    snapshot, offset = decode_search_cursor(after or '') or (None, 0)
+    ids, snapshot = ranked_ids(match, snapshot)
+    page_ids = ids[offset:offset + per_page]
+    found = snippets(match, page_ids)
+    posts_by_id = Post.objects.feed().in_bulk(list(found))
+    posts = []
+    for pk in page_ids:
+        # Удалённые или изменённые после снимка посты пропускаем
+        if pk in posts_by_id:
+            post = posts_by_id[pk]
+            post.snippet = highlight(found[pk])
+            posts.append(post)
+    next_cursor = None
+    if offset + per_page < len(ids):
+        next_cursor = encode_search_cursor(snapshot, offset + per_page)
+    return SearchPage(posts, next_cursor)
+
+
+def matching_ids(query):
+    """Подзапрос id постов по индексу, для фильтрации queryset."""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (fts_query(query),)
+    )
@@ -0,0 +1,185 @@
+from django.apps import apps as global_apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.page_cache import GLOBAL_SCOPE, bump_page_generations
+from . import archive, details, groups, search
+from .cards import bump_author_cards, bump_post_card
+from .counters import (change_author_count, change_group_count,
+                       count_bulk_created)
+from .models import Follow, Group, Post, User, posts_bulk_created
+from .notifications import hub
+from .paginators import feed_count_key, invalidate_feed_counts
+from .scopes import post_scopes, username_key
+from .tasks import fan_out_post
+from .timeline import follow_changed, follow_source
+
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+COUNTED_FIELDS = ('author_id', 'group_id')
+
+
+@receiver(post_init, sender=Post)
+def remember_counted_relations(sender, instance, **kwargs):
+    # Отложенные поля (only/defer) не читаем: это запрос к базе, который
+    # сам создаёт экземпляр и снова вызывает post_init
+    instance._counted = {
+        attname: instance.__dict__[attname]
+        for attname in COUNTED_FIELDS if attname in instance.__dict__
+    }
+
+
+def counted(instance, attname):
+    """Значение поля на момент загрузки или последнего сохранения."""
+    if attname in instance._counted:
+        return instance._counted[attname]
+    return getattr(instance, attname)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_caches(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_feed_counts([instance])
+    bump_page_generations(*post_scopes(
+        instance, [instance.group_id, counted(instance, 'group_id')]))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_details(sender, instance, created, raw=False,
+                                  **kwargs):
+    if raw:
+        return
+    details.invalidate_posts([instance.pk])
+    # Новый пост меняет число постов на страницах всех постов автора
+    old_author_id = counted(instance, 'author_id')
+    if created:
+        details.invalidate_authors([instance.author_id])
+    elif instance.author_id != old_author_id:
+        details.invalidate_authors([instance.author_id, old_author_id])
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_details(sender, instance, **kwargs):
+    details.invalidate_posts([instance.pk])
+    details.invalidate_authors([counted(instance, 'author_id')])
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        fan_out_post.delay(post_id=instance.pk)
+    elif instance.group_id != counted(instance, 'group_id'):
+        fan_out_post.delay(post_id=instance.pk, group_only=True)
+
+
+@receiver(post_save, sender=Post)
+def notify_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: hub.publish(instance))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_author_count(instance.author_id, 1)
+        change_group_count(instance.group_id, 1)
+    else:
+        old_author_id = counted(instance, 'author_id')
+        if instance.author_id != old_author_id:
+            change_author_count(old_author_id, -1)
+            change_author_count(instance.author_id, 1)
+        old_group_id = counted(instance, 'group_id')
+        if instance.group_id != old_group_id:
+            change_group_count(old_group_id, -1)
+            change_group_count(instance.group_id, 1)
+    remember_counted_relations(sender, instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_author_count(counted(instance, 'author_id'), -1)
+    change_group_count(counted(instance, 'group_id'), -1)
+
+
+@receiver(posts_bulk_created, sender=Post)
+def count_bulk_created_posts(sender, posts, **kwargs):
+    count_bulk_created(posts)
+    invalidate_feed_counts(posts)
+    details.invalidate_authors({post.author_id for post in posts})
+    bump_page_generations(GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_card(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        bump_post_card(instance.pk)
+
+
+@receiver(post_init, sender=User)
+def remember_card_fields(sender, instance, **kwargs):
+    instance._card_fields = [
+        instance.__dict__.get(field) for field in CARD_USER_FIELDS]
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    remembered = instance._card_fields
+    remember_card_fields(sender, instance)
+    if remembered != instance._card_fields:
+        cache.delete(username_key(instance.pk))
+        bump_author_cards(instance.pk)
+        details.invalidate_authors([instance.pk])
+        bump_page_generations(GLOBAL_SCOPE)
+
+
+@receiver(post_delete, sender=User)
+def forget_username(sender, instance, **kwargs):
+    # SQLite отдаёт id удалённого пользователя новому
+    cache.delete(username_key(instance.pk))
+    details.invalidate_authors([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        groups.invalidate()
+        # SQLite отдаёт id удалённой группы новой
+        cache.delete(feed_count_key('group', instance.pk))
+        bump_page_generations(GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow_changed(*follow_source(instance), followed=True)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    follow_changed(*follow_source(instance), followed=False)
+
+
+def drop_post_views(sender, using, **kwargs):
+    """Перед migrate снимает представления поверх posts_post."""
+    archive.drop_history(using)
+
+
+def restore_post_schema(sender, using, apps=global_apps, **kwargs):
+    """После migrate возвращает то, что снимает пересборка posts_post."""
+    search.restore_search_index(using)
+    try:
+        apps.get_model('posts', 'PostHistory')
+    except LookupError:
+        # migrate откатил posts до 0011
+        return
+    archive.restore_history(using)
@@ -0,0 +1,19 @@
+from core.tasks import task
+from .models import Post
+from .timeline import fan_out, fan_out_many, prune_entries
+
+
+@task(max_attempts=5)
+def fan_out_post(post_id, group_only=False):
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'pub_date', 'author_id', 'group_id').first()
+    if post is not None:
+        fan_out(post, group_only=group_only)
+        if group_only:
+            prune_entries(post)
+
+
+@task(max_attempts=5)
+def fan_out_posts(post_ids):
+    fan_out_many(Post.objects.filter(pk__in=post_ids).only(
+        'id', 'pub_date', 'author_id', 'group_id'))
@@ -0,0 +1,94 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive
+from ..admin import DateNavigationQuerySet, EstimatedCountPaginator
+from ..models import Group, Post, User
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        authors = [User.objects.create_user(f'author{i}') for i in range(3)]
+        groups = [
+            Group.objects.create(
+                title=f'group {i}', slug=f'group-{i}', description='')
+            for i in range(3)
+        ]
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=authors[i % 3], group=groups[i % 3])
+            for i in range(30)
+        )
+        for year in (2019, 2021):
+            Post.objects.filter(pk__in=Post.objects.filter(
+                pub_date__year=timezone.now().year).values('pk')[:5]).update(
+                pub_date=timezone.make_aware(datetime.datetime(year, 3, 1)))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+        self.client.get(self.url)
+
+    def changelist(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """строки списка не делают своих запросов"""
+        response, queries = self.changelist()
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 8, '\n'.join(queries))
+        self.assertEqual(
+            [sql for sql in queries if 'COUNT(' in sql and 'LIMIT' not in sql],
+            [])
+        self.assertNotIn('DISTINCT', ' '.join(queries))
+
+    def test_group_uses_autocomplete(self):
+        """группа в списке редактируется через автодополнение"""
+        response, _ = self.changelist()
+        self.assertContains(response, 'admin-autocomplete')
+        # В каждой строке только выбранная группа, а не все группы
+        self.assertContains(response, '>group 1</option>', count=10)
+        response = self.client.get(
+            reverse('admin:posts_group_autocomplete'), {'term': 'group 1'})
+        self.assertEqual(
+            [item['text'] for item in response.json()['results']],
+            ['group 1'])
+
+    def test_date_hierarchy_years(self):
+        """годы навигации находятся прыжками по индексу"""
+        queryset = DateNavigationQuerySet(model=Post)
+        years = [day.year for day in queryset.dates('pub_date', 'year')]
+        self.assertEqual(years, [2019, 2021, timezone.now().year])
+        self.assertEqual(
+            list(queryset.dates('pub_date', 'year', order='DESC')),
+            list(Post.objects.dates('pub_date', 'year', order='DESC')))
+        months = queryset.filter(pub_date__year=2019).dates(
+            'pub_date', 'month')
+        self.assertEqual(months, [datetime.date(2019, 3, 1)])
+
+    @mock.patch('posts.admin.ADMIN_COUNT_LIMIT', 10)
+    def test_estimated_count(self):
+        """без фильтров число из счётчиков, с фильтрами — не больше предела"""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 30)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text__startswith='post'), 10)
+        self.assertEqual(paginator.count, 10)
+
+    @mock.patch('posts.admin.ADMIN_COUNT_LIMIT', 10)
+    def test_estimated_count_skips_archive(self):
+        """архивные посты из счётчиков не попадают в число строк"""
+        self.assertEqual(archive.archive_posts(), 10)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 20)
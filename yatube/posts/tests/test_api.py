@@ -0,0 +1,128 @@
+import json
+from unittest import mock
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import api
+from ..models import Group, Post, User
+
+
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            'author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        Post.objects.bulk_create(
+            Post(text=f'post {num}', author=cls.author,
+                 group=cls.group if num % 2 else None)
+            for num in range(25)
+        )
+        cls.post = Post.objects.filter(group=cls.group).first()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return json.loads(response.content)
+
+    def test_cursor_pagination(self):
+        """курсоры проходят ленту целиком без повторов и обратно"""
+        path = reverse('posts:api_index')
+        page = self.get_json(path, limit=10)
+        self.assertIsNone(page['previous'])
+        ids = [post['id'] for post in page['results']]
+        while page['next']:
+            page = self.get_json(path, limit=10, before=page['next'])
+            ids += [post['id'] for post in page['results']]
+        self.assertEqual(
+            ids, list(Post.objects.values_list('id', flat=True)))
+        back = self.get_json(path, limit=10, after=page['previous'])
+        self.assertEqual([post['id'] for post in back['results']],
+                         ids[10:20])
+
+    def test_fields(self):
+        """fields= оставляет только запрошенные поля"""
+        page = self.get_json(
+            reverse('posts:api_group_list', kwargs={'slug': 'test-slug'}),
+            fields='id,group,author_name')
+        self.assertEqual(len(page['results']), 10)
+        self.assertEqual(
+            page['results'][0],
+            {'id': page['results'][0]['id'], 'group': 'test-slug',
+             'author_name': 'Лев Толстой'})
+
+    def test_unknown_fields(self):
+        """неизвестное поле — ошибка 400"""
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'text,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', json.loads(response.content)['error'])
+
+    def test_post_details(self):
+        """пост отдаётся по id, несуществующий — 404"""
+        data = self.get_json(reverse(
+            'posts:api_post_details', kwargs={'post_id': self.post.id}))
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['author'], 'author')
+        response = self.client.get(reverse(
+            'posts:api_profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_etag(self):
+        """неизменённая страница отдаёт 304, новый пост сбрасывает ETag"""
+        path = reverse('posts:api_profile', kwargs={'username': 'author'})
+        etag = self.client.get(path)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='new post', author=self.author)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_edit_resets_details(self):
+        """правка поста сбрасывает кеш его страницы в API"""
+        path = reverse(
+            'posts:api_post_details', kwargs={'post_id': self.post.id})
+        self.get_json(path)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'changed'
+        post.save()
+        self.assertEqual(self.get_json(path)['text'], 'changed')
+
+    def test_export_streams(self):
+        """выгрузка отдаётся потоком пачками и содержит все посты"""
+        self.client.force_login(
+            User.objects.create_user('staff', is_staff=True))
+        with mock.patch.object(api, 'EXPORT_CHUNK_SIZE', 10):
+            response = self.client.get(
+                reverse('posts:api_export'), {'fields': 'id'})
+            self.assertTrue(response.streaming)
+            with self.assertNumQueries(3):
+                data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), Post.objects.count())
+        self.assertEqual(data[0], {'id': Post.objects.order_by('id')[0].id})
+
+    def test_export_needs_staff_or_token(self):
+        """выгрузка закрыта для остальных, токен её открывает"""
+        path = reverse('posts:api_export')
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.client.force_login(self.author)
+        self.assertEqual(
+            self.client.get(path).status_code, HTTPStatus.FORBIDDEN)
+        self.client.logout()
+        with mock.patch.object(api, 'API_EXPORT_TOKEN', 'secret'):
+            response = self.client.get(
+                path, HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+            response = self.client.get(
+                path, HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, HTTPStatus.OK)
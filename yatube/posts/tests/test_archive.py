@@ -0,0 +1,140 @@
+import datetime
+import json
+
+from django.core.cache import cache
+from django.core.management.sql import (emit_post_migrate_signal,
+                                        emit_pre_migrate_signal)
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive
+from ..counters import rebuild_counters
+from ..models import AuthorStats, Group, Post, PostHistory, User
+
+
+def old_date(year, day):
+    return timezone.make_aware(datetime.datetime(year, 6, day))
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        posts = [
+            Post.objects.create(
+                text=f'post {i}', author=cls.author, group=cls.group)
+            for i in range(25)
+        ]
+        for number, post in enumerate(posts[:15]):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=old_date(2019 + number // 8, number % 8 + 1))
+        cls.archived = posts[:15]
+
+    def setUp(self):
+        cache.clear()
+        archive.archive_posts(batch_size=4)
+
+    def profile(self, **params):
+        return self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}), params)
+
+    def test_old_posts_move_to_yearly_tables(self):
+        """старые посты переносятся по годам и остаются в счётчиках"""
+        self.assertEqual(archive.archive_years(), [2019, 2020])
+        self.assertEqual(Post.objects.count(), 10)
+        self.assertEqual(PostHistory.objects.count(), 25)
+        self.assertEqual(self.author.post_stats.posts_count, 25)
+        self.assertEqual(archive.archive_posts(), 0)
+
+    def test_archive_is_read_only(self):
+        """архивные таблицы нельзя менять"""
+        table = archive.archive_table(2019)
+        for sql in (f'UPDATE {table} SET text = %s',
+                    f'DELETE FROM {table} WHERE id <> %s',
+                    f'INSERT INTO {table} VALUES (1000, %s, 0, 1, NULL)'):
+            with self.subTest(sql=sql), self.assertRaises(DatabaseError):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(sql, ['x'])
+
+    def test_profile_pages_fall_through(self):
+        """страницы профиля за горячим окном читаются из архива"""
+        first = self.profile().context['page_obj']
+        self.assertIsInstance(first[0], Post)
+        second = self.profile(page=2).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in second],
+            [post.pk for post in reversed(self.archived[5:])])
+        self.assertEqual(second.paginator.num_pages, 3)
+        cursor_page = self.profile(before=first.next_cursor).context[
+            'page_obj']
+        self.assertEqual(list(cursor_page), list(second))
+        newer = self.profile(after=second.previous_cursor).context[
+            'page_obj']
+        self.assertEqual([post.pk for post in newer],
+                         [post.pk for post in first])
+
+    def test_group_and_post_pages(self):
+        """группа и страница поста видят архивные посты"""
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            {'page': 3})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        response = self.client.get(reverse(
+            'posts:post_details', kwargs={'post_id': self.archived[0].pk}))
+        self.assertContains(response, 'post 0')
+
+    def test_api_reads_archive(self):
+        """API профиля и поста видит архивные посты"""
+        path = reverse('posts:api_profile', kwargs={'username': 'author'})
+        page = json.loads(self.client.get(path, {'fields': 'id'}).content)
+        ids = [post['id'] for post in page['results']]
+        while page['next']:
+            page = json.loads(self.client.get(
+                path, {'fields': 'id', 'before': page['next']}).content)
+            ids += [post['id'] for post in page['results']]
+        self.assertEqual(len(ids), 25)
+        response = self.client.get(reverse(
+            'posts:api_post_details',
+            kwargs={'post_id': self.archived[0].pk}))
+        self.assertEqual(json.loads(response.content)['text'], 'post 0')
+
+    def test_compact_drops_posts_of_deleted_authors(self):
+        """сжатие убирает посты удалённых авторов"""
+        stranger = User.objects.create_user('stranger')
+        post = Post.objects.create(text='stranger', author=stranger)
+        Post.objects.filter(pk=post.pk).update(pub_date=old_date(2019, 20))
+        archive.archive_posts()
+        stranger.delete()
+        self.assertEqual(archive.compact_archive(2019), 8)
+        self.assertEqual(PostHistory.objects.count(), 25)
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {archive.archive_table(2019)}')
+
+    def test_rebuild_counters_include_archive(self):
+        """пересчёт счётчиков учитывает архив"""
+        AuthorStats.objects.all().delete()
+        rebuild_counters()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 25)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 25)
+
+
+class HistoryViewMigrateTests(TransactionTestCase):
+    def test_post_table_can_be_rebuilt(self):
+        """migrate снимает представление, и SQLite пересобирает posts_post"""
+        author = User.objects.create_user('author')
+        Post.objects.create(text='post', author=author)
+        emit_pre_migrate_signal(0, False, 'default')
+        # Так SQLite выполняет AddField, AlterField и RemoveField
+        with connection.schema_editor() as editor:
+            editor._remake_table(Post)
+        emit_post_migrate_signal(0, False, 'default')
+        self.assertEqual(PostHistory.objects.count(), 1)
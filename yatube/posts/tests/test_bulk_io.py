@@ -0,0 +1,124 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.tasks import run_pending
+from .. import archive
+from ..models import AuthorStats, Follow, Group, Post, TimelineEntry, User
+
+
+class ImportExportCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group',
+            slug='test-slug',
+            description='description'
+        )
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def import_file(self, name, content, *args):
+        with open(self.path(name), 'w', encoding='utf-8') as file:
+            file.write(content)
+        out = StringIO()
+        call_command('import_posts', self.path(name), *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_jsonl_keeps_pub_date(self):
+        """импорт сохраняет исходную дату и обновляет счётчики"""
+        rows = [
+            {'text': 'old post', 'pub_date': '2015-03-01T10:00:00+00:00',
+             'author': 'author', 'group': 'test-slug'},
+            {'text': 'no group', 'pub_date': '2016-03-01T10:00:00+00:00',
+             'author': 'author'},
+            {'text': 'unknown author', 'author': 'nobody'},
+            {'text': 'unknown group', 'author': 'author', 'group': 'nope'},
+        ]
+        output = self.import_file(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows),
+            '--batch-size', '2')
+        self.assertIn('Загружено постов: 2, пропущено строк: 2', output)
+        post = Post.objects.get(text='old post')
+        self.assertEqual(
+            post.pub_date,
+            datetime.datetime(2015, 3, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(post.group, self.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2)
+        self.assertTrue(
+            Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_bad_dates_are_skipped(self):
+        """неразборчивая дата пропускает строку, а не весь импорт"""
+        rows = [
+            {'text': 'bad format', 'pub_date': 'вчера', 'author': 'author'},
+            {'text': 'out of range', 'pub_date': '2020-02-30T10:00:00',
+             'author': 'author'},
+            {'text': 'fine', 'pub_date': '2020-02-28T10:00:00',
+             'author': 'author'},
+        ]
+        output = self.import_file(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        self.assertIn('Загружено постов: 1, пропущено строк: 2', output)
+        self.assertIn('неверная дата: 2', output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['fine'])
+
+    def test_import_fans_out_to_followers(self):
+        """загруженные посты попадают в ленты подписчиков"""
+        reader = User.objects.create_user('reader')
+        Follow.objects.create(user=reader, author=self.author)
+        rows = [{'text': f'post {num}', 'author': 'author'}
+                for num in range(3)]
+        self.import_file(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        run_pending()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 3)
+
+    def test_export_import_roundtrip(self):
+        """выгрузка в csv загружается обратно без потерь"""
+        Post.objects.create(text='first, "quoted"\nline', author=self.author,
+                            group=self.group)
+        Post.objects.create(text='second', author=self.author)
+        expected = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author', 'group'))
+        call_command('export_posts', self.path('posts.csv'),
+                     '--chunk-size', '1', stderr=StringIO())
+        Post.objects.all().delete()
+        call_command('import_posts', self.path('posts.csv'), stdout=StringIO())
+        imported = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author', 'group'))
+        self.assertEqual(imported, expected)
+
+    def test_export_includes_archive(self):
+        """выгрузка берёт и посты, ушедшие в архив"""
+        old = Post.objects.create(text='archived', author=self.author)
+        Post.objects.filter(pk=old.pk).update(pub_date=timezone.make_aware(
+            datetime.datetime(2019, 6, 1)))
+        Post.objects.create(text='recent', author=self.author)
+        cache.clear()
+        archive.archive_posts()
+        self.assertEqual(Post.objects.count(), 1)
+        call_command('export_posts', self.path('posts.jsonl'),
+                     stderr=StringIO())
+        with open(self.path('posts.jsonl'), encoding='utf-8') as file:
+            texts = [json.loads(line)['text'] for line in file]
+        self.assertEqual(texts, ['archived', 'recent'])
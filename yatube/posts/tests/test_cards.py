@@ -0,0 +1,117 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from .. import cards
+from ..models import Post, User
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            'author', first_name='Лев', last_name='Толстой')
+        cls.post = Post.objects.create(text='текст поста', author=cls.author)
+        Post.objects.create(text='другой пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.index = reverse('posts:index')
+
+    def get_rendered_cards(self):
+        with mock.patch.object(
+            cards, 'render_cards', wraps=cards.render_cards
+        ) as render:
+            response = self.client.get(self.index)
+        return response, sum(len(call[0][0]) for call in render.call_args_list)
+
+    def test_cards_rendered_once(self):
+        """карточки рендерятся один раз и дальше берутся из кеша"""
+        response, rendered = self.get_rendered_cards()
+        self.assertEqual(rendered, 2)
+        self.assertContains(response, 'текст поста')
+        _, rendered = self.get_rendered_cards()
+        self.assertEqual(rendered, 0)
+
+    def test_post_edit_bumps_card(self):
+        """редактирование поста обновляет его карточку"""
+        self.get_rendered_cards()
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'новый текст'}
+        )
+        response, rendered = self.get_rendered_cards()
+        self.assertEqual(rendered, 1)
+        self.assertContains(response, 'новый текст')
+
+    def test_author_rename_bumps_cards(self):
+        """смена имени автора обновляет все его карточки"""
+        self.get_rendered_cards()
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        response, rendered = self.get_rendered_cards()
+        self.assertEqual(rendered, 2)
+        self.assertContains(response, 'Алексей Толстой')
+
+    def test_last_login_keeps_cards(self):
+        """вход пользователя не сбрасывает карточки"""
+        self.get_rendered_cards()
+        self.author.save(update_fields=['last_login'])
+        _, rendered = self.get_rendered_cards()
+        self.assertEqual(rendered, 0)
+
+
+# Карточка в том виде, в котором она подключалась через {% include %}
+INCLUDE_CARD = """<article>
+  <ul>
+    <li>
+      Автор: {{ post.author.get_full_name }}
+    </li>
+    <li>
+      Дата публикации: {{post.pub_date|date:"d E Y" }}
+    </li>
+    <a href="{% url 'posts:profile' post.author %}">все посты автора</a>
+  </ul>
+  <p>{{ post.text|linebreaksbr }}</p>
+</article>"""
+
+
+class RenderCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        first = User.objects.create_user(
+            'first', first_name='Анна', last_name='<Каренина>')
+        second = User.objects.create_user('second.user+1')
+        Post.objects.bulk_create(
+            Post(text=f'пост {num}\nвторая <строка>',
+                 author=first if num % 2 else second)
+            for num in range(5)
+        )
+        posts = list(Post.objects.feed())
+        posts[0].pub_date -= datetime.timedelta(days=40)
+        cls.posts = posts
+
+    def test_same_html_as_include(self):
+        """один проход даёт тот же html, что include на каждый пост"""
+        include = engines['django'].from_string(
+            '{% for post in posts %}{% include card %}{% endfor %}')
+        expected = include.render({
+            'posts': self.posts,
+            'card': engines['django'].from_string(INCLUDE_CARD).template,
+        })
+        self.assertEqual(''.join(cards.render_cards(self.posts)), expected)
+
+    def test_urls_once_per_author(self):
+        """ссылка на профиль строится один раз на автора"""
+        with mock.patch.object(cards, 'reverse',
+                               wraps=cards.reverse) as reverse_url:
+            cards.render_cards(self.posts)
+        self.assertEqual(reverse_url.call_count, 2)
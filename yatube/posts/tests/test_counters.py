@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+
+from core.page_cache import generation_key
+from ..cards import post_version_key
+from ..models import AuthorStats, Post, Group, User
+from ..paginators import feed_count_key
+from ..scopes import index_scopes
+
+
+class PostCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group',
+            slug='test-slug',
+            description='description'
+        )
+        cls.other_group = Group.objects.create(
+            title='other group',
+            slug='other-slug',
+            description='description'
+        )
+
+    def assertCounters(self, author_count, group_count, other_count=0):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, author_count)
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_count)
+
+    def test_create_and_delete(self):
+        """счётчики меняются при создании и удалении поста"""
+        post = Post.objects.create(
+            text='text', author=self.author, group=self.group)
+        Post.objects.create(text='text', author=self.author)
+        self.assertCounters(2, 1)
+        post.delete()
+        self.assertCounters(1, 0)
+
+    def test_group_reassignment(self):
+        """смена группы переносит пост между счётчиками групп"""
+        post = Post.objects.create(
+            text='text', author=self.author, group=self.group)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = None
+        post.save()
+        self.assertCounters(1, 0, 0)
+
+    def test_decrement_stops_at_zero(self):
+        """сбитый в ноль счётчик не ломает удаление поста"""
+        post = Post.objects.create(
+            text='text', author=self.author, group=self.group)
+        AuthorStats.objects.update(posts_count=0)
+        Group.objects.update(posts_count=0)
+        post.delete()
+        self.assertCounters(0, 0)
+
+    def test_bulk_create(self):
+        """bulk_create тоже обновляет счётчики"""
+        Post.objects.bulk_create(
+            Post(text='text', author=self.author, group=self.group)
+            for _ in range(3)
+        )
+        self.assertCounters(3, 3)
+
+    def test_recount_command(self):
+        """recount_posts восстанавливает сбитые счётчики"""
+        Post.objects.create(text='text', author=self.author, group=self.group)
+        AuthorStats.objects.update(posts_count=10)
+        Group.objects.update(posts_count=10)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounters(1, 1)
+
+    def test_pages_show_counters(self):
+        """страницы автора и поста выводят счётчик без COUNT(*)"""
+        post = Post.objects.create(text='text', author=self.author)
+        client = Client()
+        pages = {
+            reverse('posts:profile', kwargs={'username': self.author}):
+                (2, 'Всего постов: 1'),
+            reverse('posts:post_details', kwargs={'post_id': post.id}):
+                (1, '<span >1</span>'),
+        }
+        for path, (queries, html) in pages.items():
+            with self.subTest(path=path):
+                with self.assertNumQueries(queries):
+                    response = client.get(path)
+                self.assertContains(response, html)
+
+
+class PostCountersAtomicTests(TransactionTestCase):
+    def test_failed_counter_rolls_back_post(self):
+        """ошибка в счётчиках откатывает и сам пост"""
+        author = User.objects.create_user('author')
+        with mock.patch('posts.signals.change_group_count',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Post.objects.create(text='text', author=author)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_caches_reset_after_commit(self):
+        """кеши, заполненные до коммита правки, сбрасываются после него"""
+        cache.clear()
+        post = Post.objects.create(
+            text='text', author=User.objects.create_user('author'))
+        keys = [post_version_key(post.pk), generation_key(index_scopes()[0]),
+                feed_count_key('index')]
+        with transaction.atomic():
+            post.text = 'edited'
+            post.save()
+            # Другой процесс читает ленту, пока правка не закоммичена
+            cache.set_many({key: 'stale' for key in keys}, None)
+        self.assertNotIn('stale', cache.get_many(keys).values())
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import routers
+
+from .. import details
+from ..groups import registry
+from ..models import Group, Post, User
+
+
+class PostDetailsCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            'author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        cls.post = Post.objects.create(
+            text='post text', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse(
+            'posts:post_details', kwargs={'post_id': self.post.pk})
+
+    def get(self):
+        return self.client.get(self.url).content.decode()
+
+    def test_cached_page_without_queries(self):
+        """повторный показ поста не обращается к базе"""
+        first = self.get()
+        registry.load()
+        with self.assertNumQueries(0):
+            second = self.get()
+        self.assertEqual(first, second)
+        for text in ('post text', 'Лев Толстой', 'test-slug', '>1<'):
+            self.assertIn(text, second)
+
+    def test_cached_record_does_not_pin_primary(self):
+        """пост из кеша не прилепляет читателя к основной базе"""
+        details.get_post_details(self.post.pk)
+        routers.reset()
+        self.addCleanup(routers.reset)
+        post = details.get_post_details(self.post.pk)
+        self.assertEqual(post.group, self.group)
+        self.assertFalse(routers.has_written())
+
+    def test_edit_invalidates(self):
+        """правка поста видна сразу"""
+        self.get()
+        self.post.text = 'edited'
+        self.post.save()
+        self.assertIn('edited', self.get())
+
+    def test_new_post_updates_author_count(self):
+        """новый пост автора меняет счётчик на странице старого"""
+        self.get()
+        Post.objects.create(text='another', author=self.author)
+        self.assertIn('>2<', self.get())
+
+    def test_group_and_author_edits(self):
+        """переименование группы и автора видно на странице поста"""
+        self.get()
+        self.group.title = 'renamed group'
+        self.group.save()
+        self.author.first_name = 'Николай'
+        self.author.save()
+        page = self.get()
+        self.assertIn('renamed group', page)
+        self.assertIn('Николай Толстой', page)
+
+    def test_new_post_touches_one_author_key(self):
+        """новый пост сбрасывает одну запись автора, не записи постов"""
+        others = [Post.objects.create(text=f'old {num}', author=self.author)
+                  for num in range(3)]
+        for post in others:
+            self.client.get(reverse(
+                'posts:post_details', kwargs={'post_id': post.pk}))
+        with self.assertNumQueries(0):
+            details.invalidate_authors([self.author.pk])
+        self.assertIsNotNone(cache.get(details.detail_key(others[0].pk)))
+        self.assertIsNone(cache.get(details.author_key(self.author.pk)))
+        with self.assertNumQueries(1):
+            self.assertIn('>4<', self.client.get(reverse(
+                'posts:post_details',
+                kwargs={'post_id': others[0].pk})).content.decode())
+
+    def test_invalidation_repeats_on_commit(self):
+        """сброс повторяется после коммита записи"""
+        self.get()
+        with mock.patch.object(details.transaction, 'on_commit') as on_commit:
+            details.invalidate_authors([self.author.pk])
+        cache.set(details.author_key(self.author.pk), {'stale': True})
+        callback, = on_commit.call_args[0]
+        callback()
+        self.assertIsNone(cache.get(details.author_key(self.author.pk)))
+
+    def test_missing_post(self):
+        """несуществующий пост — 404"""
+        response = self.client.get(
+            reverse('posts:post_details', kwargs={'post_id': 999}))
+        self.assertEqual(response.status_code, 404)
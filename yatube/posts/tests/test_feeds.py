@@ -0,0 +1,82 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from ..models import Group, Post, User
+
+
+class PostFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            'author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        Post.objects.create(
+            text='пост в группе', author=cls.author, group=cls.group)
+        Post.objects.create(text='пост без группы', author=cls.author)
+        cls.feeds = {
+            reverse('posts:index_rss'): ('пост в группе', 'пост без группы'),
+            reverse('posts:group_atom', kwargs={'slug': 'test-slug'}):
+                ('пост в группе',),
+            reverse('posts:profile_rss', kwargs={'username': 'author'}):
+                ('пост в группе', 'пост без группы'),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_items(self):
+        """лента содержит записи своего раздела"""
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'test-slug'}))
+        self.assertContains(response, 'пост в группе')
+        self.assertNotContains(response, 'пост без группы')
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/rss+xml'))
+        response = self.client.get(
+            reverse('posts:profile_atom', kwargs={'username': 'author'}))
+        self.assertContains(response, 'Лев Толстой')
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/atom+xml'))
+
+    def test_polling_without_queries(self):
+        """повторный опрос — из кеша или 304, без SQL"""
+        for path, texts in self.feeds.items():
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                for text in texts:
+                    self.assertContains(first, text)
+                with self.assertNumQueries(0):
+                    cached = self.client.get(path)
+                    not_modified = self.client.get(
+                        path, HTTP_IF_NONE_MATCH=first['ETag'])
+                    by_date = self.client.get(
+                        path,
+                        HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+                self.assertEqual(cached.content, first.content)
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(by_date.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_new_post_renders_again(self):
+        """новая запись попадает в закешированную ленту"""
+        path = reverse('posts:profile_rss', kwargs={'username': 'author'})
+        first = self.client.get(path)
+        Post.objects.create(text='свежая запись', author=self.author)
+        # Запись в ту же секунду, что и первый ответ, всё равно новее него
+        response = self.client.get(
+            path, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertContains(response, 'свежая запись')
+        self.assertGreater(parse_http_date(response['Last-Modified']),
+                           parse_http_date(first['Last-Modified']))
+
+    def test_unknown_group(self):
+        """лента несуществующего сообщества — 404"""
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
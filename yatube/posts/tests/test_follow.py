@@ -0,0 +1,182 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tasks import run_pending
+from ..models import Follow, Group, Post, TimelineEntry, User
+
+
+class FollowTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+        cls.stranger = User.objects.create_user('stranger')
+        cls.group = Group.objects.create(
+            title='group',
+            slug='test-slug',
+            description='description'
+        )
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_author(self):
+        return self.reader_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+
+    def follow_group(self):
+        return self.reader_client.post(reverse(
+            'posts:group_follow', kwargs={'slug': self.group.slug}))
+
+    def timeline(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """подписка сразу заполняет ленту старыми постами автора"""
+        response = self.follow_author()
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author}))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(self.timeline(), [self.old_post])
+
+    def test_new_posts_fan_out(self):
+        """новый пост попадает в ленты подписчиков автора и группы"""
+        self.follow_group()
+        by_author = Post.objects.create(text='by author', author=self.author)
+        in_group = Post.objects.create(
+            text='in group', author=self.stranger, group=self.group)
+        run_pending()
+        self.assertEqual(self.timeline(), [in_group])
+        self.follow_author()
+        Post.objects.create(text='late', author=self.author)
+        run_pending()
+        self.assertEqual(len(self.timeline()), 4)
+        self.assertIn(by_author, self.timeline())
+
+    def test_unfollow_keeps_other_sources(self):
+        """отписка убирает только посты, на которые нет другой подписки"""
+        self.follow_author()
+        self.follow_group()
+        in_group = Post.objects.create(
+            text='in group', author=self.author, group=self.group)
+        run_pending()
+        self.reader_client.post(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertEqual(self.timeline(), [in_group])
+        self.reader_client.post(reverse(
+            'posts:group_unfollow', kwargs={'slug': self.group.slug}))
+        self.assertEqual(self.timeline(), [])
+
+    def test_unfollow_one_of_two_authors(self):
+        """отписка от одного из двух авторов убирает только его посты"""
+        self.follow_author()
+        self.reader_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.stranger}))
+        by_stranger = Post.objects.create(
+            text='by stranger', author=self.stranger)
+        run_pending()
+        self.reader_client.post(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertEqual(self.timeline(), [by_stranger])
+
+    def test_unfollow_one_of_two_groups(self):
+        """отписка от одной из двух групп убирает только её посты"""
+        other_group = Group.objects.create(
+            title='other', slug='other-slug', description='description')
+        self.follow_group()
+        self.reader_client.post(reverse(
+            'posts:group_follow', kwargs={'slug': other_group.slug}))
+        in_group = Post.objects.create(
+            text='in group', author=self.stranger, group=self.group)
+        Post.objects.create(
+            text='in other', author=self.stranger, group=other_group)
+        run_pending()
+        self.reader_client.post(reverse(
+            'posts:group_unfollow', kwargs={'slug': other_group.slug}))
+        self.assertEqual(self.timeline(), [in_group])
+
+    def test_group_change_moves_post(self):
+        """смена группы убирает пост из лент подписчиков старой группы"""
+        self.follow_group()
+        post = Post.objects.create(
+            text='in group', author=self.stranger, group=self.group)
+        run_pending()
+        self.assertEqual(self.timeline(), [post])
+        post.group = None
+        post.save()
+        run_pending()
+        self.assertEqual(self.timeline(), [])
+
+    def test_timeline_count_is_cached(self):
+        """число записей ленты не пересчитывается на каждый запрос"""
+        self.follow_author()
+        self.timeline()
+        with CaptureQueriesContext(connection) as context:
+            self.timeline()
+        self.assertFalse(any('COUNT(*)' in query['sql']
+                             for query in context.captured_queries))
+        Post.objects.create(text='new', author=self.author)
+        run_pending()
+        self.assertEqual(len(self.timeline()), 2)
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 0)
+    def test_high_fanout_author_is_pulled(self):
+        """посты популярного автора читаются без записи в ленты"""
+        self.follow_author()
+        post = Post.objects.create(text='popular', author=self.author)
+        run_pending()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 0)
+    def test_pulled_timeline_without_aggregates(self):
+        """лента с популярным автором не считает подписчиков и посты"""
+        self.follow_author()
+        self.timeline()
+        with CaptureQueriesContext(connection) as context:
+            self.timeline()
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('GROUP BY', query['sql'])
+        post = Post.objects.create(text='popular', author=self.author)
+        run_pending()
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [post, self.old_post])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 1)
+    def test_new_follower_makes_source_popular(self):
+        """подписка сверх порога переводит автора в дочитываемые"""
+        self.follow_author()
+        self.timeline()
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(text='popular', author=self.author)
+        run_pending()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+    def test_cannot_follow_self(self):
+        """на себя подписаться нельзя"""
+        self.reader_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.reader}))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post_and_login(self):
+        """подписка только POST-запросом авторизованного пользователя"""
+        url = reverse('posts:profile_follow', kwargs={'username': self.author})
+        self.assertEqual(self.reader_client.get(url).status_code, 405)
+        response = self.client.post(url)
+        self.assertRedirects(response, f"{reverse('users:login')}?next={url}")
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,59 @@
+from django import forms
+from django.test import TestCase
+from django.urls import reverse
+
+from ..forms import PostForm
+from ..groups import GroupRegistry, get_group_or_404, registry
+from ..models import Group, Post, User
+
+
+class GroupRegistryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        cls.author = User.objects.create_user('author')
+
+    def test_lookup_without_queries(self):
+        """прогретый реестр находит группу по slug без запросов"""
+        registry.load()
+        with self.assertNumQueries(0):
+            group = get_group_or_404('test-slug')
+        self.assertEqual(group, self.group)
+        self.assertIsNot(group, registry.get('test-slug'))
+
+    def test_form_choices_without_queries(self):
+        """варианты группы в форме берутся из реестра"""
+        registry.load()
+        with self.assertNumQueries(0):
+            form = PostForm()
+            html = form.as_p()
+        self.assertIn('>group</option>', html)
+        self.assertIs(type(form.fields['group']), forms.ModelChoiceField)
+        form = PostForm(data={'text': 'text', 'group': self.group.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.group)
+
+    def test_rename_reaches_other_processes(self):
+        """переименование видно реестру другого процесса"""
+        other = GroupRegistry()
+        self.assertEqual(other.get('test-slug').title, 'group')
+        self.group.title = 'renamed'
+        self.group.save()
+        self.assertEqual(other.get('test-slug').title, 'renamed')
+        Group.objects.create(title='new', slug='new', description='')
+        self.assertIsNotNone(other.get('new'))
+        with self.assertNumQueries(0):
+            other.get('new')
+
+    def test_group_page(self):
+        """страница группы и 404 на неизвестный slug"""
+        Post.objects.create(text='post', author=self.author, group=self.group)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}))
+        self.assertEqual(response.context['group'], self.group)
+        self.assertEqual(len(response.context['page_obj']), 1)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
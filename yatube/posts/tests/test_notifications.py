@@ -0,0 +1,160 @@
+import json
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..notifications import (INDEX_SCOPE, PostHub, author_scope,
+                             group_scope)
+
+
+class PostHubTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group', slug='test-slug', description='description')
+        cls.post = Post.objects.create(
+            text='post', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        self.hub = PostHub(refresh_seconds=60)
+
+    def test_latest(self):
+        """последний id области берётся из базы один раз"""
+        self.assertEqual(self.hub.latest(INDEX_SCOPE), self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.hub.latest(INDEX_SCOPE), self.post.pk)
+
+    def test_publish_counts_new_posts(self):
+        """опубликованные посты считаются без запросов к базе"""
+        scope = group_scope(self.group.pk)
+        since = self.hub.latest(scope)
+        posts = [Post.objects.create(text=f'new {num}', author=self.author,
+                                     group=self.group) for num in range(3)]
+        for post in posts:
+            self.hub.publish(post)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.hub.wait(scope, since, 0),
+                             (3, posts[-1].pk))
+
+    def test_wait_wakes_on_publish(self):
+        """ждущий клиент просыпается от publish, а не по таймауту"""
+        since = self.hub.latest(INDEX_SCOPE)
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(
+            new=self.hub.wait(INDEX_SCOPE, since, 10)))
+        waiter.start()
+        post = Post.objects.create(text='new', author=self.author)
+        self.hub.publish(post)
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result['new'], (1, post.pk))
+
+    def test_refresh_queries_without_lock(self):
+        """запрос к базе в refresh идёт без блокировки хаба"""
+        free = []
+        query = Post.objects.filter
+
+        def probe(**kwargs):
+            # Condition на RLock: проверять надо из другого потока
+            thread = threading.Thread(target=lambda: free.append(
+                self.hub.condition.acquire(timeout=1)
+                and self.hub.condition.release() is None))
+            thread.start()
+            thread.join()
+            return query(**kwargs)
+
+        with mock.patch.object(Post.objects, 'filter', side_effect=probe):
+            self.hub.latest(INDEX_SCOPE)
+        self.assertEqual(free, [True])
+
+    def test_scopes_are_evicted(self):
+        """хаб помнит не больше max_scopes областей"""
+        hub = PostHub(refresh_seconds=60, max_scopes=2)
+        for scope in (INDEX_SCOPE, group_scope(self.group.pk),
+                      author_scope(self.author.pk)):
+            hub.latest(scope)
+        self.assertEqual(list(hub.posts), [
+            group_scope(self.group.pk), author_scope(self.author.pk)])
+        self.assertEqual(set(hub.refreshed), set(hub.posts))
+
+    def test_refresh_finds_unpublished_posts(self):
+        """посты других процессов находятся запросом после refresh_seconds"""
+        hub = PostHub(refresh_seconds=0)
+        since = hub.latest(INDEX_SCOPE)
+        post = Post.objects.create(text='elsewhere', author=self.author)
+        self.assertEqual(hub.wait(INDEX_SCOPE, since, 0), (1, post.pk))
+
+
+class PostEventsViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.first = Post.objects.create(text='first', author=cls.author)
+        cls.second = Post.objects.create(text='second', author=cls.author)
+
+    def setUp(self):
+        patcher = mock.patch('posts.views.hub', PostHub(refresh_seconds=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_long_poll(self):
+        """long-poll сразу отвечает, если новые посты уже есть"""
+        response = self.client.get(
+            reverse('posts:profile_events', kwargs={'username': 'author'}),
+            {'since': self.first.pk, 'poll': 1})
+        self.assertEqual(json.loads(response.content),
+                         {'count': 1, 'latest': self.second.pk})
+
+    def test_event_stream(self):
+        """SSE присылает событие posts с числом новых постов"""
+        response = self.client.get(
+            reverse('posts:index_events'), {'since': self.first.pk})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b'retry: 5000\n\n')
+        event = next(events).decode()
+        self.assertTrue(event.startswith('event: posts\ndata: '))
+        data = json.loads(event.split('data: ')[1])
+        self.assertEqual(data, {'count': 1, 'latest': self.second.pk})
+        response.close()
+
+    def test_streams_are_capped(self):
+        """сверх EVENTS_MAX_STREAMS поток сразу закрывается с долгим retry"""
+        with mock.patch('posts.views.event_streams',
+                        threading.BoundedSemaphore(1)) as streams:
+            streams.acquire()
+            response = self.client.get(reverse('posts:index_events'))
+            self.assertEqual(list(response.streaming_content),
+                             [b'retry: 60000\n\n'])
+            streams.release()
+
+    def test_long_polls_are_capped(self):
+        """long-poll сверх EVENTS_MAX_STREAMS сразу получает 503"""
+        url = reverse('posts:index_events')
+        with mock.patch('posts.views.event_streams',
+                        threading.BoundedSemaphore(1)) as streams:
+            streams.acquire()
+            response = self.client.get(url, {'poll': 1})
+            self.assertEqual(response.status_code,
+                             HTTPStatus.SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '60')
+            streams.release()
+            response = self.client.get(
+                url, {'since': self.first.pk, 'poll': 1})
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            # Место возвращено: следующий запрос тоже проходит
+            self.assertTrue(streams.acquire(blocking=False))
+            streams.release()
+
+    def test_banner_on_first_page(self):
+        """первая страница ленты подписывается на поток новых постов"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, f"{reverse('posts:index_events')}?since=")
@@ -0,0 +1,114 @@
+import datetime
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, Group, User
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group',
+            slug='test-slug',
+            description='description'
+        )
+        Post.objects.create(text='first post', author=cls.author,
+                            group=cls.group)
+        cls.paths = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_anonymous_hit_without_queries(self):
+        """повторный анонимный запрос отдаётся из кеша без SQL"""
+        for path in self.paths:
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                with self.assertNumQueries(0):
+                    second = self.client.get(path)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_get(self):
+        """совпавший ETag даёт 304, Last-Modified страница не отдаёт"""
+        for path in self.paths:
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                by_etag = self.client.get(
+                    path, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(by_etag.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(by_etag.content, b'')
+                self.assertFalse(first.has_header('Last-Modified'))
+
+    def test_host_in_cache_key(self):
+        """страница другого хоста не берётся из кеша"""
+        path = self.paths[0]
+        self.client.get(path)
+        with self.assertNumQueries(0):
+            self.client.get(path)
+        response = self.client.get(path, HTTP_HOST='localhost')
+        self.assertIn('page_obj', response.context)
+
+    def test_deleted_author_loads_username_once(self):
+        """удаление автора с постами читает его имя один раз"""
+        author = User.objects.create_user('prolific')
+        Post.objects.bulk_create(
+            Post(text='text', author=author) for _ in range(5))
+        author = User.objects.get(pk=author.pk)
+        with CaptureQueriesContext(connection) as context:
+            author.delete()
+        lookups = [query for query in context.captured_queries
+                   if query['sql'].startswith('SELECT "auth_user"')]
+        self.assertEqual(len(lookups), 1)
+
+    def test_new_post_invalidates_pages(self):
+        """новый пост сбрасывает кеш ленты, группы и автора"""
+        for path in self.paths:
+            self.client.get(path)
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'fresh post', 'group': self.group.id}
+        )
+        for path in self.paths:
+            with self.subTest(path=path):
+                self.assertContains(self.client.get(path), 'fresh post')
+
+    def test_other_group_keeps_cache(self):
+        """пост в другой группе не сбрасывает кеш группы"""
+        path = self.paths[1]
+        self.client.get(path)
+        Post.objects.create(text='outside', author=self.author)
+        with self.assertNumQueries(0):
+            self.client.get(path)
+
+    def test_authenticated_not_cached(self):
+        """авторизованные пользователи получают свежую страницу"""
+        path = self.paths[0]
+        self.author_client.get(path)
+        response = self.author_client.get(path)
+        self.assertIn('page_obj', response.context)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_year_in_cache_key(self):
+        """смена года в подвале страницы не отдаёт старый кеш"""
+        path = self.paths[0]
+        self.client.get(path)
+        with mock.patch('core.context_processors.year.datetime') as mocked:
+            mocked.date.today.return_value = datetime.date(2100, 1, 1)
+            response = self.client.get(path)
+        self.assertIn('page_obj', response.context)
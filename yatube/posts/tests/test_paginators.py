@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Post, User
+from ..paginators import FeedPaginator, feed_count_key
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        Post.objects.bulk_create(
+            Post(text=f'text {num}', author=cls.author) for num in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.key = feed_count_key('index')
+
+    def paginator(self, per_page=2):
+        return FeedPaginator(Post.objects.all(), per_page, count_key=self.key)
+
+    def test_count_is_cached(self):
+        """число постов считается один раз и берётся из кеша"""
+        self.assertEqual(self.paginator().count, 25)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, 25)
+
+    def test_count_invalidated_on_save(self):
+        """новый пост сбрасывает закешированное число"""
+        self.assertEqual(self.paginator().count, 25)
+        Post.objects.create(text='new', author=self.author)
+        self.assertEqual(self.paginator().count, 26)
+
+    def test_page_window(self):
+        """диапазон страниц не растёт вместе с лентой"""
+        window = self.paginator().page(7).page_window
+        self.assertEqual(list(window), [5, 6, 7, 8, 9])
+        window = self.paginator().page(1).page_window
+        self.assertEqual(list(window), [1, 2, 3])
+
+    def test_far_pages_from_end(self):
+        """дальние страницы совпадают с обычными и не читают всю ленту"""
+        posts = list(Post.objects.all())
+        paginator = self.paginator(per_page=4)
+        for number in (4, 5, 6, 7):
+            with self.subTest(number=number):
+                bottom = (number - 1) * 4
+                self.assertEqual(list(paginator.page(number)),
+                                 posts[bottom:bottom + 4])
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator(per_page=4).page(7)
+        self.assertNotIn('OFFSET', queries[-1]['sql'])
+
+    @mock.patch('posts.paginators.COUNT_LIMIT', 5)
+    def test_no_total_mode(self):
+        """большая лента листается без общего числа постов"""
+        paginator = self.paginator(per_page=10)
+        page_obj = paginator.page(2)
+        self.assertFalse(paginator.has_total)
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.has_next())
+        self.assertEqual(list(page_obj.page_window), [1, 2, 3])
+        last = self.paginator(per_page=10).get_page(3)
+        self.assertEqual(len(last), 5)
+        self.assertFalse(last.has_next())
+        self.assertEqual(self.paginator(per_page=10).get_page(9).number, 1)
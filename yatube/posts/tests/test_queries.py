@@ -0,0 +1,74 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from ..models import Post, Group, User
+from ..urls import urlpatterns
+from ..views import POSTS_ON_SCREEN
+
+
+class PostsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='description'
+        )
+        groups = [
+            Group.objects.create(
+                title=f'group {num}',
+                slug=f'slug-{num}',
+                description='description'
+            ) for num in range(3)
+        ]
+        posts = [
+            Post(
+                text=f'test text {num}',
+                author=cls.author,
+                group=groups[num % len(groups)]
+            ) for num in range(POSTS_ON_SCREEN + 3)
+        ]
+        posts.extend(
+            Post(text='group post', author=cls.author, group=cls.group)
+            for _ in range(POSTS_ON_SCREEN + 3)
+        )
+        Post.objects.bulk_create(posts)
+        cls.post = Post.objects.filter(group=cls.group).first()
+        cls.url_kwargs = {
+            'slug': cls.group.slug,
+            'username': cls.author.username,
+            'post_id': cls.post.id,
+        }
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def reverse_pattern(self, pattern):
+        kwargs = {
+            name: self.url_kwargs[name]
+            for name in pattern.pattern.converters
+        }
+        return reverse(f'posts:{pattern.name}', kwargs=kwargs)
+
+    def test_views_within_query_budget(self):
+        """view из posts.urls укладываются в объявленный бюджет запросов"""
+        for pattern in urlpatterns:
+            path = self.reverse_pattern(pattern)
+            with self.subTest(path=path):
+                self.assertWithinQueryBudget(self.author_client, path)
+                self.assertWithinQueryBudget(
+                    self.author_client, path, data={'page': 2})
+
+    def test_form_posts_within_query_budget(self):
+        """отправка форм укладывается в бюджет запросов"""
+        form_data = {'text': 'new text', 'group': self.group.id}
+        for name in ('post_create', 'post_edit'):
+            pattern = next(p for p in urlpatterns if p.name == name)
+            path = self.reverse_pattern(pattern)
+            with self.subTest(path=path):
+                self.assertWithinQueryBudget(
+                    self.author_client, path, method='post', data=form_data)
@@ -0,0 +1,99 @@
+from django.contrib.admin.sites import site
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import TRIGGERS
+from ..views import POSTS_ON_SCREEN
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.exact = Post.objects.create(
+            text='Кот и <b>кот</b> встретили кота', author=cls.author)
+        cls.other = Post.objects.create(
+            text='Собака гуляет одна, а кот спит', author=cls.author)
+        Post.objects.create(text='Про погоду', author=cls.author)
+        cls.url = reverse('posts:search')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_ranked_results(self):
+        """найденные посты упорядочены по релевантности"""
+        page_obj = self.search('кот')
+        self.assertEqual(list(page_obj), [self.exact, self.other])
+
+    def test_highlighted_snippet(self):
+        """в сниппете подсвечено слово, а html поста экранирован"""
+        post = self.search('собака')[0]
+        self.assertIn('<mark>Собака</mark>', post.snippet)
+        snippet = self.search('встретили')[0].snippet
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_index_follows_edit_and_delete(self):
+        """индекс обновляется при изменении и удалении поста"""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Собака спит'
+        other.save()
+        self.assertEqual(list(self.search('кот')), [self.exact])
+        Post.objects.get(pk=self.exact.pk).delete()
+        self.assertEqual(len(self.search('кот')), 0)
+
+    def test_query_operators_are_ignored(self):
+        """операторы FTS5 в запросе не ломают поиск"""
+        for query in ('кот OR', '"кот', 'NEAR(кот', '*', ''):
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pages(self):
+        """результаты листаются курсором без повторов"""
+        Post.objects.bulk_create(
+            Post(text=f'кот номер {num}', author=self.author)
+            for num in range(POSTS_ON_SCREEN)
+        )
+        first = self.search('кот')
+        self.assertTrue(first.has_next())
+        second = self.search('кот', after=first.next_cursor)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+
+    def test_cursor_survives_new_posts(self):
+        """новые посты не сдвигают уже начатое листание"""
+        Post.objects.bulk_create(
+            Post(text=f'кот номер {num}', author=self.author)
+            for num in range(POSTS_ON_SCREEN)
+        )
+        first = self.search('кот')
+        expected = list(self.search('кот', after=first.next_cursor))
+        Post.objects.bulk_create(
+            Post(text='кот кот кот', author=self.author)
+            for _ in range(POSTS_ON_SCREEN)
+        )
+        second = self.search('кот', after=first.next_cursor)
+        self.assertEqual(list(second), expected)
+
+    def test_migrate_restores_triggers(self):
+        """migrate возвращает триггеры, снятые пересборкой таблицы"""
+        with connection.cursor() as cursor:
+            for trigger in TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        emit_post_migrate_signal(0, False, 'default')
+        Post.objects.create(text='Ёжик в тумане', author=self.author)
+        self.assertEqual(len(self.search('ёжик')), 1)
+
+    def test_admin_search_uses_index(self):
+        """поиск в админке идёт через тот же индекс"""
+        admin_model = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, may_have_duplicates = admin_model.get_search_results(
+            request, Post.objects.all(), 'собака')
+        self.assertEqual(list(queryset), [self.other])
+        self.assertIn('posts_post_fts', str(queryset.query))
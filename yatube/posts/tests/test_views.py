@@ -243,3 +243,71 @@ class PaginatorTests(TestCase):
         self.paginator_create_post(reverse(
             'posts:profile',
             kwargs={'username': self.author}))
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='description'
+        )
+        posts = [
+            Post(
+                text=f'test text {num}',
+                author=cls.author,
+                group=cls.group
+            ) for num in range(25)
+        ]
+        Post.objects.bulk_create(posts)
+        cls.paths = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_cursor_pages_match_numbered_pages(self):
+        """курсоры ведут на те же посты, что и номера страниц"""
+        for path in self.paths:
+            with self.subTest(path=path):
+                first = self.author_client.get(path).context['page_obj']
+                second = self.author_client.get(
+                    path + '?page=2').context['page_obj']
+                by_cursor = self.author_client.get(
+                    path + f'?before={first.next_cursor}'
+                ).context['page_obj']
+                self.assertTrue(by_cursor.is_cursor)
+                self.assertEqual(list(by_cursor), list(second))
+                self.assertTrue(by_cursor.has_next())
+                self.assertTrue(by_cursor.has_previous())
+                back = self.author_client.get(
+                    path + f'?after={by_cursor.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_last_page(self):
+        """последняя страница по курсору не имеет следующей"""
+        path = reverse('posts:index')
+        page_obj = self.author_client.get(path).context['page_obj']
+        while page_obj.has_next():
+            page_obj = self.author_client.get(
+                path + f'?before={page_obj.next_cursor}'
+            ).context['page_obj']
+        self.assertEqual(len(page_obj), 5)
+        self.assertIsNone(page_obj.next_cursor)
+
+    def test_broken_cursor(self):
+        """битый курсор открывает первую страницу"""
+        response = self.author_client.get(
+            reverse('posts:index') + '?before=broken')
+        page_obj = response.context['page_obj']
+        self.assertFalse(page_obj.is_cursor)
+        self.assertEqual(page_obj.number, 1)
@@ -0,0 +1,259 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cards import get_versions, new_version
+from .models import Follow, Post, TimelineEntry
+from .paginators import FeedPaginator, feed_count_key
+
+# Посты источников с большим числом подписчиков не раскладываются по
+# лентам при записи, а дочитываются из posts_post при чтении ленты
+FANOUT_LIMIT = getattr(settings, 'POSTS_FANOUT_LIMIT', 1000)
+BACKFILL_POSTS = getattr(settings, 'POSTS_TIMELINE_BACKFILL', 50)
+FANOUT_FLAG_TIMEOUT = getattr(
+    settings, 'POSTS_FANOUT_FLAG_TIMEOUT', 60 * 60)
+FANOUT_BATCH = 1000
+
+
+def fanout_key(field, value):
+    return f'posts:high_fanout:{field}:{value}'
+
+
+def is_high_fanout(**source):
+    return Follow.objects.filter(
+        **source)[:FANOUT_LIMIT + 1].count() > FANOUT_LIMIT
+
+
+def high_fanout_sources(sources):
+    """Популярные из источников (поле, id): флаги из кеша.
+
+    Промах считает подписчиков не дальше FANOUT_LIMIT + 1 по индексу
+    источника; дальше флаг поддерживает follow_changed.
+    """
+    keys = {fanout_key(*source): source for source in sources}
+    flags = cache.get_many(list(keys))
+    missing = {}
+    for key, (field, value) in keys.items():
+        if key not in flags:
+            flags[key] = missing[key] = is_high_fanout(**{field: value})
+    if missing:
+        cache.set_many(missing, FANOUT_FLAG_TIMEOUT)
+    return {keys[key] for key, flag in flags.items() if flag}
+
+
+def follow_changed(field, value, followed):
+    """Сбрасывает флаг, если подписка могла перевести источник за порог.
+
+    Подписка не делает популярный источник обычным, а отписка — обычный
+    популярным, поэтому флаг сбрасывается только в одну сторону.
+    """
+    key = fanout_key(field, value)
+    flag = cache.get(key)
+    if flag is not None and flag != followed:
+        cache.delete(key)
+
+
+def follow_source(follow):
+    if follow.author_id is not None:
+        return 'author_id', follow.author_id
+    return 'group_id', follow.group_id
+
+
+def fanout_followers(**source):
+    """id подписчиков источника или None, если их больше FANOUT_LIMIT."""
+    user_ids = list(Follow.objects.filter(**source).values_list(
+        'user_id', flat=True)[:FANOUT_LIMIT + 1])
+    return None if len(user_ids) > FANOUT_LIMIT else user_ids
+
+
+def timeline_count_key(user_id):
+    return feed_count_key('timeline', user_id)
+
+
+def timeline_version_key(user_id):
+    return f'posts:timeline_version:user:{user_id}'
+
+
+def source_version_key(field, value):
+    return f'posts:timeline_version:{field}:{value}'
+
+
+def invalidate_timeline_counts(user_ids):
+    cache.delete_many(
+        [timeline_count_key(pk) for pk in user_ids]
+        + [timeline_version_key(pk) for pk in user_ids])
+
+
+def bump_sources(sources):
+    """Новые посты популярных источников меняют число в лентах читателей."""
+    if sources:
+        cache.set_many({source_version_key(*source): new_version()
+                        for source in sources}, None)
+
+
+def pulled_count_key(user_id, sources):
+    """Ключ числа постов ленты с популярными источниками.
+
+    В ключе версии ленты и источников: лента сбрасывается как обычно, а
+    новый пост популярного источника меняет его версию, не обходя всех
+    подписчиков.
+    """
+    keys = [timeline_version_key(user_id)] + [
+        source_version_key(*source) for source in sorted(sources)]
+    versions = get_versions(keys)
+    digest = hashlib.md5(
+        ':'.join(versions[key] for key in keys).encode()).hexdigest()
+    return f'{timeline_count_key(user_id)}:{digest}'
+
+
+def add_entries(user_ids, posts):
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for user_id in user_ids for post in posts
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH, ignore_conflicts=True)
+    invalidate_timeline_counts(user_ids)
+
+
+def post_sources(post, group_only=False):
+    sources = [] if group_only else [('author_id', post.author_id)]
+    if post.group_id is not None:
+        sources.append(('group_id', post.group_id))
+    return sources
+
+
+def fan_out(post, group_only=False):
+    """Раскладывает новый пост по лентам подписчиков автора и группы."""
+    user_ids, pulled = set(), []
+    for field, value in post_sources(post, group_only):
+        followers = fanout_followers(**{field: value})
+        if followers is None:
+            pulled.append((field, value))
+        else:
+            user_ids.update(followers)
+    user_ids.discard(post.author_id)
+    add_entries(user_ids, [post])
+    bump_sources(pulled)
+
+
+def fan_out_many(posts):
+    """fan_out для пачки постов, подписчики источника читаются один раз."""
+    followers = {}
+    for post in posts:
+        user_ids = set()
+        for source in post_sources(post):
+            if source not in followers:
+                field, value = source
+                followers[source] = fanout_followers(**{field: value})
+            user_ids.update(followers[source] or ())
+        user_ids.discard(post.author_id)
+        add_entries(user_ids, [post])
+    bump_sources([source for source, followed in followers.items()
+                  if followed is None])
+
+
+def prune_entries(post):
+    """Убирает пост из лент тех, кто не подписан ни на автора, ни на группу.
+
+    Нужно после смены группы поста: fan_out добавляет его подписчикам
+    новой группы, а записи подписчиков старой остаются.
+    """
+    sources = Q(author_id=post.author_id)
+    if post.group_id is not None:
+        sources |= Q(group_id=post.group_id)
+    entries = TimelineEntry.objects.filter(post_id=post.pk).exclude(
+        user__in=Follow.objects.filter(sources).values('user'))
+    user_ids = list(entries.values_list('user_id', flat=True))
+    if user_ids:
+        entries.delete()
+        invalidate_timeline_counts(user_ids)
+
+
+def follow(user, **source):
+    """Подписывает и сразу заполняет ленту последними постами источника."""
+    follow, created = Follow.objects.get_or_create(user=user, **source)
+    if created and not high_fanout_sources([follow_source(follow)]):
+        posts = Post.objects.filter(**source).exclude(author=user).only(
+            'id', 'pub_date')[:BACKFILL_POSTS]
+        add_entries([user.pk], posts)
+    return created
+
+
+def unfollow(user, **source):
+    """Отписывает и убирает из ленты посты, которые больше не нужны."""
+    Follow.objects.filter(user=user, **source).delete()
+    follows = Follow.objects.filter(user=user)
+    entries = TimelineEntry.objects.filter(user=user)
+    # NULL в подзапросе NOT IN делает условие ложным для всех строк
+    if 'author_id' in source:
+        entries = entries.filter(post__author_id=source['author_id']).exclude(
+            post__group__in=follows.filter(
+                group__isnull=False).values('group'))
+    else:
+        entries = entries.filter(post__group_id=source['group_id']).exclude(
+            post__author__in=follows.filter(
+                author__isnull=False).values('author'))
+    entries.delete()
+    invalidate_timeline_counts([user.pk])
+
+
+def pull_sources(user):
+    """Источники пользователя, посты которых читаются напрямую."""
+    sources = [
+        ('author_id', author_id) if author_id is not None
+        else ('group_id', group_id)
+        for author_id, group_id in Follow.objects.filter(
+            user=user).values_list('author', 'group')
+    ]
+    return high_fanout_sources(sources)
+
+
+class TimelinePaginator(FeedPaginator):
+    """Лента подписок по индексу TimelineEntry (user, -pub_date, -post).
+
+    object_list — записи ленты пользователя; на странице оказываются
+    их посты, загруженные одним запросом.
+    """
+
+    ordering = ('-pub_date', '-post_id')
+    id_field = 'post_id'
+
+    def from_end(self, number):
+        # Удаление поста не сбрасывает число записей: оно может быть
+        # больше настоящего, и отсчёт с конца промахнётся
+        return False
+
+    def fetch(self, rows):
+        post_ids = [entry.post_id for entry in rows]
+        posts = Post.objects.feed().in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+
+def timeline_paginator(user, per_page):
+    """Paginator ленты подписок.
+
+    Лента читается по записям timeline с закешированным числом записей,
+    а если у пользователя есть популярные источники — запросом к
+    постам, который дочитывает их посты из posts_post.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    pulled = pull_sources(user)
+    if not pulled:
+        return TimelinePaginator(
+            entries.only('post', 'pub_date'), per_page,
+            count_key=timeline_count_key(user.pk))
+    condition = Q(id__in=entries.values('post'))
+    for field, value in pulled:
+        condition |= Q(**{field: value})
+    return FeedPaginator(
+        Post.objects.feed().filter(condition), per_page,
+        count_key=pulled_count_key(user.pk, pulled))
+
+
+def is_following(user, **source):
+    return (user.is_authenticated
+            and Follow.objects.filter(user=user, **source).exists())
@@ -1,57 +1,132 @@
-from django.core.paginator import Paginator
+import json
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_GET, require_POST
 
-from .models import Post, Group, User
+from core.decorators import query_budget
+from core.identity import identity_map
+from core.page_cache import anonymous_page_cache
+from .archive import ArchivePaginator
+from .cards import attach_cards
+from .counters import author_posts_count
+from .details import get_post_details
+from .groups import get_group_or_404
+from .models import Post, PostHistory, User
+from .notifications import INDEX_SCOPE, author_scope, group_scope, hub
 from .forms import PostForm
+from .paginators import FeedPaginator, feed_count_key
+from .search import search_posts
+from .scopes import author_scopes, group_scopes, index_scopes
+from .timeline import (follow, is_following, timeline_paginator,
+                       unfollow)
 
 
 POSTS_ON_SCREEN = 10
+# Комментарий-пинг держит соединение SSE живым за прокси
+EVENTS_HEARTBEAT = 15
+# После этого браузер сам переподключается к потоку
+EVENTS_STREAM_SECONDS = 5 * 60
+# Под WSGI каждый поток SSE и long-poll занимает поток сервера на всё
+# время жизни, поэтому одновременных потоков в процессе не больше этого
+EVENTS_MAX_STREAMS = getattr(settings, 'POSTS_EVENTS_MAX_STREAMS', 20)
+# Через сколько миллисекунд браузер повторит, если мест нет
+EVENTS_BUSY_RETRY = 60 * 1000
+LONG_POLL_TIMEOUT = 25
 
 
-def add_paginator(request, object_list, per_page=POSTS_ON_SCREEN):
-    paginator = Paginator(object_list, per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def request_page(request, paginator):
+    page_obj = paginator.get_cursor_page(
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+    if page_obj is None:
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def add_paginator(request, object_list, per_page=POSTS_ON_SCREEN,
+                  count=None, count_key=None, archive_list=None):
+    if archive_list is None:
+        paginator = FeedPaginator(
+            object_list, per_page, count=count, count_key=count_key)
+    else:
+        paginator = ArchivePaginator(
+            object_list, per_page, archive_list,
+            count=count, count_key=count_key)
+    return request_page(request, paginator)
+
+
+@query_budget(4)
+@anonymous_page_cache(index_scopes)
 def index(request):
-    post_list = Post.objects.select_related('author').all()
+    post_list = Post.objects.feed()
     context = {
-        'page_obj': add_paginator(request, post_list)
+        'page_obj': attach_cards(add_paginator(
+            request, post_list, count_key=feed_count_key('index'))),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(5)
+@anonymous_page_cache(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
+    group = get_group_or_404(slug)
+    post_list = group.posts.feed()
     context = {
         'group': group,
-        'page_obj': add_paginator(request, post_list),
+        'following': is_following(request.user, group=group),
+        'page_obj': attach_cards(add_paginator(
+            request, post_list,
+            count_key=feed_count_key('group', group.pk),
+            archive_list=PostHistory.objects.feed().filter(group=group))),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(5)
+@anonymous_page_cache(author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author')
+    author = get_object_or_404(
+        User.objects.select_related('post_stats'), username=username)
+    post_list = author.posts.feed()
     context = {
         'author': author,
-        'page_obj': add_paginator(request, post_list),
+        'following': is_following(request.user, author=author),
+        'page_obj': attach_cards(add_paginator(
+            request, post_list, count=author_posts_count(author),
+            archive_list=PostHistory.objects.feed().filter(author=author))),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(3)
 def post_details(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_details(post_id)
     context = {
         'post': post,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(5)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': search_posts(query, POSTS_ON_SCREEN,
+                                 after=request.GET.get('after')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(9)
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
@@ -64,19 +139,23 @@ def post_create(request):
 
 
 def author_only(func):
+    @wraps(func)
     def check_author(request, post_id):
-        post = get_object_or_404(Post, pk=post_id)
+        objects = identity_map(request)
+        post = objects.get_or_404(Post, post_id)
         if request.user.is_authenticated:
-            if request.user == post.author:
+            if request.user.pk == post.author_id:
+                objects.load_related([post], 'author')
                 return func(request, post_id)
             return redirect('posts:post_details', post_id)
         return redirect('users:login')
     return check_author
 
 
+@query_budget(11)
 @author_only
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = identity_map(request).get_or_404(Post, post_id)
     form = PostForm(request.POST or None, instance=post)
     if form.is_valid():
         form.save()
@@ -87,3 +166,120 @@ def post_edit(request, post_id):
         'is_edit': True,
     }
     return render(request, 'posts/create_post.html', context)
+
+
+@query_budget(6)
+@login_required
+def follow_index(request):
+    context = {
+        'page_obj': attach_cards(request_page(
+            request, timeline_paginator(request.user, POSTS_ON_SCREEN))),
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@query_budget(6)
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        follow(request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@query_budget(6)
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author_id=author.pk)
+    return redirect('posts:profile', username)
+
+
+@query_budget(6)
+@login_required
+@require_POST
+def group_follow(request, slug):
+    group = get_group_or_404(slug)
+    follow(request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@query_budget(6)
+@login_required
+@require_POST
+def group_unfollow(request, slug):
+    group = get_group_or_404(slug)
+    unfollow(request.user, group_id=group.pk)
+    return redirect('posts:group_list', slug)
+
+
+event_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+def event_stream(scope, since):
+    # Место занимается на первой итерации: иначе незапущенный генератор
+    # не вернул бы его в finally
+    if not event_streams.acquire(blocking=False):
+        yield f'retry: {EVENTS_BUSY_RETRY}\n\n'
+        return
+    try:
+        deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+        sent = since
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < deadline:
+            count, latest = hub.wait(scope, sent, EVENTS_HEARTBEAT)
+            if not count:
+                yield ': ping\n\n'
+                continue
+            # Число считается от since страницы, а не от прошлого события
+            count, latest = hub.newer(scope, since)
+            sent = latest
+            data = json.dumps({'count': count, 'latest': latest})
+            yield f'event: posts\ndata: {data}\n\n'
+    finally:
+        event_streams.release()
+
+
+def post_events(request, scope):
+    """SSE «N новых постов» новее ?since=; с ?poll=1 — long-poll в JSON."""
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = hub.latest(scope)
+    if request.GET.get('poll'):
+        if not event_streams.acquire(blocking=False):
+            response = JsonResponse({'retry': EVENTS_BUSY_RETRY}, status=503)
+            response['Retry-After'] = EVENTS_BUSY_RETRY // 1000
+            return response
+        try:
+            count, latest = hub.wait(scope, since, LONG_POLL_TIMEOUT)
+        finally:
+            event_streams.release()
+        return JsonResponse({'count': count, 'latest': latest})
+    response = StreamingHttpResponse(
+        event_stream(scope, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@query_budget(1)
+@require_GET
+def index_events(request):
+    return post_events(request, INDEX_SCOPE)
+
+
+@query_budget(2)
+@require_GET
+def group_events(request, slug):
+    group = get_group_or_404(slug)
+    return post_events(request, group_scope(group.pk))
+
+
+@query_budget(2)
+@require_GET
+def profile_events(request, username):
+    author = get_object_or_404(User, username=username)
+    return post_events(request, author_scope(author.pk))
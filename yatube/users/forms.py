@@ -1,10 +1,36 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from core.mail import send_password_reset
+
 User = get_user_model()
+# Ключи контекста, которые send_password_reset строит сам
+RESET_CONTEXT = {
+    'email', 'domain', 'site_name', 'uid', 'user', 'token', 'protocol'}
 
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Сброс пароля через очередь: в задачу попадает id, а не токен."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        send_password_reset.delay(
+            user_id=context['user'].pk,
+            domain=context['domain'],
+            site_name=context['site_name'],
+            use_https=context['protocol'] == 'https',
+            subject_template_name=subject_template_name,
+            email_template_name=email_template_name,
+            html_email_template_name=html_email_template_name,
+            from_email=from_email,
+            extra_email_context={
+                key: value for key, value in context.items()
+                if key not in RESET_CONTEXT},
+        )
@@ -2,6 +2,7 @@ import django.contrib.auth.views as auth
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -32,7 +33,8 @@ urlpatterns = [
     path(
         'password_reset/',
         auth.PasswordResetView.as_view(
-            template_name='users/password_reset_form.html'),
+            template_name='users/password_reset_form.html',
+            form_class=QueuedPasswordResetForm),
         name='password_reset_form'
     ),
     path(
@@ -29,11 +29,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +45,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,9 +68,53 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, сломанное закрывается
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # Сколько секунд ждать блокировку записи (busy timeout);
+        # повторы в core.db ограничены ещё и SQLITE_BUSY_MAX_WAIT
+        'OPTIONS': {'timeout': 5},
     }
 }
 
+# Реплики только для чтения: пути к копиям основной базы через запятую.
+# Локально подходит копия db.sqlite3, её обновляет manage.py sync_replicas
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_REPLICA_DB', '').split(',')),
+        start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Приложения, чтения которых можно отдавать репликам
+REPLICA_READ_APPS = ['posts']
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_STICKY_SECONDS = 15
+
+# Для нескольких процессов нужен общий бэкенд (memcached, redis):
+# поколения страничного кеша и версии карточек живут здесь
+CACHES = {
+    'default': {
+        'BACKEND': 'core.backends.CountingLocMemCache',
+    }
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Сессии и пользователь запроса читаются из кеша, база — при промахе
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTH_USER_CACHE_SECONDS = 60 * 5
+# С локальным кешем сброс не доходит до других процессов: кеш
+# пользователя включается только для одного процесса (runserver)
+AUTH_USER_CACHE_LOCAL = DEBUG
+
+# Доля запросов с заголовком Server-Timing; получают его только
+# INTERNAL_IPS и сотрудники
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.0
+INTERNAL_IPS = ['127.0.0.1']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -103,5 +150,10 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь и уходят из manage.py run_tasks
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Запросы дольше порога попадают в журнал /admin/slow-queries/
+SLOW_QUERY_THRESHOLD_MS = 100
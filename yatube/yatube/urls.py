@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import slow_queries
+
 urlpatterns = [
+    path('admin/slow-queries/', slow_queries, name='slow_queries'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),